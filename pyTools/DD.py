@@ -223,56 +223,30 @@ class DD:
         self.assume_axioms_hold = 1
 
     # Helpers
+    # Configurations are lists of deltas (the order is the split order and the tests
+    # take lists) : hashed sets keep these operations linear. Bitmasks over indices
+    # would need a conversion back to a list for each test, which is slower than the
+    # set operation itself.
     def __listminus(self, c1, c2):
         """Return a list of all elements of C1 that are not in C2."""
-        s2 = {}
-        for delta in c2:
-            s2[delta] = 1
-
-        c = []
-        for delta in c1:
-            if not delta in s2:
-                c.append(delta)
-
-        return c
+        s2 = set(c2)
+        return [delta for delta in c1 if not delta in s2]
 
     def __listintersect(self, c1, c2):
         """Return the common elements of C1 and C2."""
-        s2 = {}
-        for delta in c2:
-            s2[delta] = 1
-
-        c = []
-        for delta in c1:
-            if delta in s2:
-                c.append(delta)
-
-        return c
+        s2 = set(c2)
+        return [delta for delta in c1 if delta in s2]
 
     def __listunion(self, c1, c2):
         """Return the union of C1 and C2."""
-        s1 = {}
-        for delta in c1:
-            s1[delta] = 1
-
-        c = c1[:]
-        for delta in c2:
-            if not delta in s1:
-                c.append(delta)
-
-        return c
+        s1 = set(c1)
+        return c1 + [delta for delta in c2 if not delta in s1]
 
     def __listsubseteq(self, c1, c2):
         """Return 1 if C1 is a subset or equal to C2."""
-        s2 = {}
-        for delta in c2:
-            s2[delta] = 1
-
-        for delta in c1:
-            if not delta in s2:
-                return 0
-
-        return 1
+        if set(c1).issubset(c2):
+            return 1
+        return 0
 
     # Output
     def coerce(self, c):
@@ -325,6 +299,35 @@ class DD:
         """Stub to overload in subclasses"""
         return self.UNRESOLVED		# Placeholder
 
+    def _testFirstFail(self, cTab, nbRun):
+        """Return the index of the first failing configuration of CTAB
+        (None if there is none).  Overload in subclasses to test the
+        configurations concurrently."""
+        for i in range(len(cTab)):
+            if self._test(cTab[i], nbRun) == self.FAIL:
+                return i
+        return None
+
+
+    def complementOrder(self, c, cs, cbar_offset):
+        """Return the order in which the complements of the subsets CS
+        of C are tested by verrou_dd_min (starting from CBAR_OFFSET).
+        Overload in subclasses to change the order."""
+        n = len(cs)
+        return [(j + cbar_offset) % n for j in range(n)]
+
+    def ddminCheckpoint(self, c0, nbRun, c, n, cbar_offset, run):
+        """Called at the beginning of each iteration of verrou_dd_min
+        started with C0.  Overload in subclasses to save the state of
+        the search."""
+        pass
+
+    def ddminResume(self, c0, nbRun):
+        """Return the state (c, n, cbar_offset, run) saved by
+        ddminCheckpoint for the search started with C0 (None to start
+        from C0).  Overload in subclasses to resume a search."""
+        return None
+
 
     # Splitting
     def split(self, c, n):
@@ -701,9 +704,14 @@ class DD:
 
         run = 1
         cbar_offset = 0
+        c0 = c
+        state = self.ddminResume(c0, nbRun)
+        if state != None:
+            (c, n, cbar_offset, run) = state
 
         # We replace the tail recursion from the paper by a loop
         while 1:
+            self.ddminCheckpoint(c0, nbRun, c, n, cbar_offset, run)
             tc = self._test(c ,nbRun)
             if tc != self.FAIL and tc != self.UNRESOLVED:
                 self.internalError("verrou_dd_min","ERROR: test([all deltas]) == PASS")
@@ -753,8 +761,7 @@ class DD:
 
                 # print "cbar_offset =", cbar_offset
 
-                for j in range(n):
-                    i = (j + cbar_offset) % n
+                for i in self.complementOrder(c, cs, cbar_offset):
                     cbars[i] = self.__listminus(c, cs[i])
                     t = self._test(cbars[i],nbRun)
 
@@ -787,6 +794,85 @@ class DD:
             n = next_n
             run = run + 1
 
+    def verrou_dd_min_speculative(self, c, nbRun, window=None):
+        """Same result as verrou_dd_min, but all the subsets and complements
+        of a granularity level are given at once (by packets of WINDOW
+        configurations) to _testFirstFail"""
+        n = 2
+        algo_name="ddmin"
+
+        testNoDelta=self._test([],nbRun)
+        if testNoDelta!=self.PASS:
+            self.internalError("verrou_dd_min_speculative","ERROR: test([]) == FAILED")
+
+        run = 1
+        cbar_offset = 0
+        c0 = c
+        state = self.ddminResume(c0, nbRun)
+        if state != None:
+            (c, n, cbar_offset, run) = state
+
+        while 1:
+            self.ddminCheckpoint(c0, nbRun, c, n, cbar_offset, run)
+            tc = self._test(c ,nbRun)
+            if tc != self.FAIL and tc != self.UNRESOLVED:
+                self.internalError("verrou_dd_min_speculative","ERROR: test([all deltas]) == PASS")
+
+            if n > len(c):
+                # No further minimizing
+                print (algo_name+": done")
+                return c
+
+            self.report_progress(c, algo_name)
+
+            cs = self.split(c, n)
+
+            print ()
+            print (algo_name+" (run #" + repr(run) + "): trying", "+".join([repr(len(cs[i])) for i in range(n)] ) )
+
+            # Canonical order of the sequential algorithm : subsets then complements
+            candidats = [(False, i) for i in range(n)] + [(True, i) for i in self.complementOrder(c, cs, cbar_offset)]
+            if window == None:
+                window = len(candidats)
+
+            found = None
+            for start in range(0, len(candidats), window):
+                packet = candidats[start:start + window]
+                cTab = [self.__listminus(c, cs[i]) if isCbar else cs[i] for (isCbar, i) in packet]
+                k = self._testFirstFail(cTab, nbRun)
+                if k != None:
+                    found = (packet[k][0], packet[k][1], cTab[k])
+                    break
+
+            next_n = n
+            if found == None:
+                if n >= len(c):
+                    # No further minimizing
+                    print (algo_name+": done")
+                    return c
+
+                next_n = min(len(c), n * 2)
+                print (algo_name+": increase granularity to", next_n)
+                cbar_offset = (cbar_offset * next_n) // n
+                next_c = c
+            else:
+                (isCbar, i, next_c) = found
+                if self.debug_dd:
+                    print (algo_name+": found", len(next_c), "deltas:",)
+                    print (self.pretty(next_c))
+                if isCbar:
+                    next_n = next_n - 1
+                    # In next run, start removing the following subset
+                    cbar_offset = i
+                else:
+                    next_n = 2
+                    cbar_offset = 0
+                self.report_progress(next_c, algo_name)
+
+            c = next_c
+            n = next_n
+            run = run + 1
+
     def ddmin(self, c):
         return self.ddgen(c, 1, 0)
 
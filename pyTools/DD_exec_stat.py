@@ -25,6 +25,7 @@
 import sys
 import os
 import time
+import json
 
 class exec_stat:
     def __init__(self,repName):
@@ -35,6 +36,7 @@ class exec_stat:
         self.timeEnd()
         self.printElapsed(int(self.end- self.start))
         self.printNbRun()
+        self.printEvents()
 
     def timeInit(self):
         self.start = time.time()
@@ -55,8 +57,47 @@ class exec_stat:
         return ((os.stat(filename).st_mtime) > self.start)
 
     def printNbRun(self,dirName="."):
-        import glob
+        indexFile=os.path.join(dirName, self.repName, "dd.index")
+        if os.path.exists(indexFile):
+            from valgrind import DD_stoch
+            index=DD_stoch.outcomeIndex(indexFile, readOnly=True)
+            print(self.repName+"  search : %i run (with cache included: %i)"%(index.countRun(self.start),index.countRun()) )
+            return
 
+        import glob
         runTab=glob.glob(dirName+"/"+self.repName+"/*/dd.run*/dd.run.out")
         runFilter=[filename for filename in runTab if self.isNew(filename)]
         print(self.repName+"  search : %i run (with cache included: %i)"%(len(runFilter),len(runTab)) )
+
+    def printEvents(self,dirName="."):
+        eventFile=os.path.join(dirName, self.repName, "dd.events")
+        if os.path.exists(eventFile) and self.isNew(eventFile):
+            summary=eventSummary(eventFile)
+            if summary!=None:
+                print(self.repName+"  throughput : "+summary)
+
+
+def eventSummary(fileName):
+    """Return the throughput summary of the last session of the event log fileName (--event-log)"""
+    events=[]
+    with open(fileName) as f:
+        for line in f:
+            try:
+                event=json.loads(line)
+            except ValueError:
+                continue #incomplete line
+            if event["event"]=="start":
+                events=[]
+            events.append(event)
+    if len(events)==0 or events[0]["event"]!="start":
+        return None
+    duration=max(events[-1]["time"]-events[0]["time"], 1.e-3)
+    nbProc=events[0]["nbProc"]
+    if nbProc==None:
+        nbProc=1
+    samples=[event for event in events if event["event"]=="sample_end"]
+    busy=sum([event.get("wall") or 0. for event in samples])
+    nbRun=sum([event["nbRun"] for event in events if event["event"]=="config"])
+    nbCached=sum([event["cached"] for event in events if event["event"]=="config"])
+    hitRate=100.*nbCached/nbRun if nbRun!=0 else 0.
+    return "%.1f samples/hour, CPU utilization %.0f%% (%i threads), cache hit rate %.0f%% (%i/%i samples)"%(len(samples)*3600./duration, 100.*busy/(duration*nbProc), nbProc, hitRate, nbCached, nbRun)
@@ -34,16 +34,35 @@ import copy
 import glob
 import datetime
 import math
+import random
+import threading
+import time
+import signal
+import tempfile
+import json
+import socket
+import importlib.util
+import contextlib
+import traceback
+import mmap
+import asyncio
+import concurrent.futures
+import queue
+import multiprocessing
 from valgrind import convNumLineTool
 from valgrind import DD
 
 
 
+runningProcesses=set()
+runningProcessesLock=threading.Lock()
+
 def runCmdAsync(cmd, fname, envvars=None):
-    """Run CMD, adding ENVVARS to the current environment, and redirecting standard
-    and error outputs to FNAME.out and FNAME.err respectively.
+    """Run CMD, adding ENVVARS to the current environment (a None value removes the variable),
+    and redirecting standard and error outputs to FNAME.out and FNAME.err respectively.
 
-    Returns CMD's exit code."""
+    CMD is run in its own session and process group (to be able to kill it with all its children).
+    Returns the subprocess.Popen object."""
     if envvars is None:
         envvars = {}
 
@@ -51,13 +70,140 @@ def runCmdAsync(cmd, fname, envvars=None):
         with open("%s.err"%fname, "w") as ferr:
             env = copy.deepcopy(os.environ)
             for var in envvars:
-                env[var] = envvars[var]
-            return subprocess.Popen(cmd, env=env, stdout=fout, stderr=ferr)
+                if envvars[var] is None:
+                    env.pop(var, None)
+                else:
+                    env[var] = envvars[var]
+            subProcess=subprocess.Popen(cmd, env=env, stdout=fout, stderr=ferr, start_new_session=True)
+            subProcess.startTime=time.monotonic()
+            with runningProcessesLock:
+                runningProcesses.add(subProcess)
+            return subProcess
+
+async def runCmdAsyncio(cmd, fname, envvars=None):
+    """Coroutine equivalent of runCmdAsync : returns the asyncio.subprocess.Process object."""
+    if envvars is None:
+        envvars = {}
 
-def getResult(subProcess):
-    subProcess.wait()
+    with open("%s.out"%fname, "w") as fout:
+        with open("%s.err"%fname, "w") as ferr:
+            env = copy.deepcopy(os.environ)
+            for var in envvars:
+                if envvars[var] is None:
+                    env.pop(var, None)
+                else:
+                    env[var] = envvars[var]
+            subProcess=await asyncio.create_subprocess_exec(*cmd, env=env, stdout=fout, stderr=ferr, start_new_session=True)
+            subProcess.startTime=time.monotonic()
+            with runningProcessesLock:
+                runningProcesses.add(subProcess)
+            return subProcess
+
+async def getResultAsyncio(subProcess, timeout=None):
+    """Coroutine equivalent of getResult (the process group is killed if the coroutine is cancelled).
+
+    The resource usage is not available with asyncio : only subProcess.wallTime is set."""
+    try:
+        await asyncio.wait_for(subProcess.wait(), timeout)
+        subProcess.wallTime=time.monotonic()-subProcess.startTime
+    except asyncio.TimeoutError:
+        killProcessGroup(subProcess, signal.SIGKILL)
+        await subProcess.wait()
+        return None
+    except asyncio.CancelledError:
+        killProcessGroup(subProcess)
+        raise
+    finally:
+        with runningProcessesLock:
+            runningProcesses.discard(subProcess)
     return subProcess.returncode
 
+def isRunning(subProcess):
+    """Return True if subProcess (subprocess.Popen or asyncio.subprocess.Process) is not finished.
+
+    A Popen object is only reaped by waitProcess : it is checked with os.waitid(WNOWAIT), which leaves the
+    exit status in place (a concurrent Popen.poll could get the ECHILD of the reaped process and overwrite
+    the returncode set by waitProcess with 0)."""
+    if subProcess.returncode!=None:
+        return False
+    if isinstance(subProcess, subprocess.Popen) and hasattr(os, "waitid"):
+        try:
+            return os.waitid(os.P_PID, subProcess.pid, os.WEXITED | os.WNOHANG | os.WNOWAIT)==None
+        except ChildProcessError:
+            #reaped by waitProcess
+            return False
+    return True
+
+def killProcessGroup(subProcess, sig=signal.SIGTERM):
+    """Send sig to the process group of subProcess (created by runCmdAsync)"""
+    try:
+        os.killpg(subProcess.pid, sig)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+def killRunningProcesses():
+    with runningProcessesLock:
+        subProcessTab=list(runningProcesses)
+    for subProcess in subProcessTab:
+        killProcessGroup(subProcess)
+
+def waitProcess(subProcess, timeout=None):
+    """Wait the end of subProcess (created by runCmdAsync) with os.wait4 : set subProcess.returncode,
+    subProcess.wallTime (s) and subProcess.rusage (None if the process was already waited). No other
+    function reaps subProcess (see isRunning).
+
+    Raise subprocess.TimeoutExpired if subProcess is not finished after timeout seconds."""
+    deadline=None
+    if timeout!=None:
+        deadline=time.monotonic()+timeout
+    delay=0.0005
+    while subProcess.returncode==None:
+        try:
+            pid, status, rusage=os.wait4(subProcess.pid, 0 if deadline==None else os.WNOHANG)
+        except ChildProcessError:
+            #already reaped : the exit status is lost
+            subProcess.wait()
+            break
+        if pid!=0:
+            subProcess.rusage=rusage
+            subProcess.wallTime=time.monotonic()-subProcess.startTime
+            subProcess.returncode=-os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+            return
+        remaining=deadline-time.monotonic()
+        if remaining<=0:
+            raise subprocess.TimeoutExpired(subProcess.args, timeout)
+        delay=min(delay*2, remaining, 0.05)
+        time.sleep(delay)
+    subProcess.rusage=None
+    subProcess.wallTime=None
+
+def getResult(subProcess, timeout=None):
+    """Wait the end of subProcess and return its exit code.
+
+    If subProcess is not finished after timeout seconds, its process group is killed and None is returned."""
+    try:
+        waitProcess(subProcess, timeout)
+    except subprocess.TimeoutExpired:
+        killProcessGroup(subProcess, signal.SIGKILL)
+        subProcess.wait()
+        return None
+    except KeyboardInterrupt:
+        #the process group does not receive the terminal signals
+        killRunningProcesses()
+        raise
+    finally:
+        with runningProcessesLock:
+            runningProcesses.discard(subProcess)
+    return subProcess.returncode
+
+def waitFutures(futures, return_when="ALL_COMPLETED"):
+    """concurrent.futures.wait which kills the running processes in case of KeyboardInterrupt"""
+    try:
+        return concurrent.futures.wait(futures, return_when=return_when)
+    except KeyboardInterrupt:
+        killRunningProcesses()
+        raise
+
 
 def runCmd(cmd, fname, envvars=None):
     """Run CMD, adding ENVVARS to the current environment, and redirecting standard
@@ -69,9 +215,969 @@ def runCmd(cmd, fname, envvars=None):
 
 
 
+class runLimits:
+    """Limits of the run script of the samples : wall-clock timeout (s), address space (MB) and cpu time (s).
+
+    A sample which exceeds a limit gets the status TIMEOUT or OOM (written in dd.run.status) and is
+    treated as FAIL or UNRESOLVED depending on policy.
+
+    RLIMIT_CPU applies to each process : the cpu limit is detected from the SIGXCPU of the run script, from
+    the exit code 128+SIGXCPU of a shell whose child was killed, and from the cpu time of the waited
+    process tree. The OOM detection (non zero exit code and a memory error message at the end of
+    dd.run.err) is best-effort."""
+
+    statusRetval={"TIMEOUT":124, "OOM":125}
+    memoryErrorPatterns=[b"out of memory", b"MemoryError", b"bad_alloc", b"Cannot allocate memory"]
+
+    def __init__(self, timeout=None, memory=None, cpu=None, policy="fail"):
+        self.timeout=timeout
+        self.memory=memory
+        self.cpu=cpu
+        self.policy=policy
+
+    def wrap(self, cmd):
+        """Return cmd prefixed by a python launcher which sets the rlimits before the exec of cmd"""
+        if self.memory==None and self.cpu==None:
+            return cmd
+        code="import resource,os,sys\n"
+        if self.memory!=None:
+            code+="resource.setrlimit(resource.RLIMIT_AS, (%i, %i))\n"%(self.memory*1024**2, self.memory*1024**2)
+        if self.cpu!=None:
+            code+="resource.setrlimit(resource.RLIMIT_CPU, (%i, resource.RLIM_INFINITY))\n"%(self.cpu)
+        code+="os.execv(sys.argv[1], sys.argv[1:])\n"
+        return [sys.executable, "-c", code]+cmd
+
+    def status(self, rundir, runRetval, rusage=None):
+        """Return TIMEOUT, OOM or None (limits respected) for a run finished with exit code runRetval (rusage of the run if known)"""
+        if runRetval==None:
+            return "TIMEOUT"
+        if self.cpu!=None:
+            if runRetval in [-signal.SIGXCPU, 128+signal.SIGXCPU]:
+                return "TIMEOUT"
+            if rusage!=None and rusage.ru_utime+rusage.ru_stime >= self.cpu:
+                return "TIMEOUT"
+        if self.memory!=None and runRetval!=0:
+            errPath=os.path.join(rundir, "dd.run.err")
+            if os.path.exists(errPath):
+                with open(errPath, "rb") as f:
+                    f.seek(max(0, os.path.getsize(errPath)-65536))
+                    tail=f.read()
+                if any(pattern in tail for pattern in self.memoryErrorPatterns):
+                    return "OOM"
+        return None
+
+
+refDigestName="dd.ref.digest"
+refPayloadName="dd.ref.payload"
+refFingerprintName="dd.ref.fingerprint"
+
+def refDigest(refDir, ignore=lambda name: False):
+    """Return the sha256 of the outputs of the reference (names and contents of the files of refDir)
+
+    The files of refDir selected by ignore (and the files written by DDStoch.reference) are not outputs."""
+    digest=hashlib.sha256()
+    for root, dirs, files in sorted(os.walk(refDir)):
+        for name in sorted(files):
+            if root==refDir and (name in [refDigestName, refPayloadName, refFingerprintName] or name.startswith("checkRef.") or ignore(name)):
+                continue
+            path=os.path.join(root, name)
+            digest.update(os.path.relpath(path, refDir).encode("utf-8")+b"\0")
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1<<20), b""):
+                    digest.update(chunk)
+            digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def readRefDigest(refDir):
+    """Return the digest written by DDStoch.reference (None if refDir has no digest)"""
+    path=os.path.join(refDir, refDigestName)
+    if not os.path.exists(path):
+        return None
+    return open(path).readline().strip()
+
+
+def fileFingerprint(path, content=True):
+    """Return the sha256 of the file path (its size and modification time if not content) : the commands of the PATH
+    are also accepted (None if path is not found)"""
+    if path==None:
+        return None
+    if not os.path.isfile(path):
+        path=shutil.which(path)
+        if path==None:
+            return None
+    path=os.path.realpath(path)
+    if not content:
+        stat=os.stat(path)
+        return "%s:%i:%i"%(path, stat.st_size, stat.st_mtime_ns)
+    digest=hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1<<20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def verrouFingerprint():
+    """Return the fingerprint (size and modification time) of the valgrind binary of the PATH and of its verrou tool"""
+    valgrind=shutil.which("valgrind")
+    if valgrind==None:
+        return []
+    libexec=os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(valgrind))), "libexec", "valgrind")
+    tools=sorted(glob.glob(os.path.join(libexec, "verrou-*"))+glob.glob(os.path.join(libexec, "vgpreload_verrou*")))
+    return [fileFingerprint(path, content=False) for path in [valgrind]+tools]
+
+
+def mapRefPayload(refDir):
+    """Return a read-only mmap of the payload extracted once from the reference with --ref-extract (None without payload).
+
+    Helper for the comparison plugins : the pages are shared by all the processes comparing with the same reference."""
+    path=os.path.join(refDir, refPayloadName)
+    if not os.path.exists(path) or os.path.getsize(path)==0:
+        return None
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+cmpPluginCache={} #entryPoint -> [function, loadReference, {refDir: (refKey, ref)}] (per process)
+
+def loadCmpPlugin(entryPoint):
+    """Return the function and the optional loadReference function of the python entry point module:function (or file.py:function)"""
+    moduleName, functionName=entryPoint.rsplit(":",1)
+    if moduleName.endswith(".py"):
+        #as for a script, the modules of its directory can be imported
+        if not os.path.dirname(moduleName) in sys.path:
+            sys.path.insert(0, os.path.dirname(moduleName))
+        spec=importlib.util.spec_from_file_location(os.path.basename(moduleName)[:-3], moduleName)
+        module=importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    else:
+        module=importlib.import_module(moduleName)
+    return (getattr(module, functionName), getattr(module, "loadReference", None))
+
+
+def callCmpPlugin(entryPoint, refDir, rundir, fname):
+    """Call the comparison plugin entryPoint in the current process, redirecting standard and error
+    outputs to FNAME.out and FNAME.err respectively.
+
+    Returns the exit code (as sys.exit would do with the value returned by the plugin)."""
+    with open(fname+".out","w") as out, open(fname+".err","w") as err:
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            try:
+                if not entryPoint in cmpPluginCache:
+                    cmpPluginCache[entryPoint]=list(loadCmpPlugin(entryPoint))+[{}]
+                function, loadReference, refCache=cmpPluginCache[entryPoint]
+                ref=refDir
+                if loadReference!=None:
+                    #the reference is loaded again if the content of refDir is modified
+                    refKey=readRefDigest(refDir)
+                    if refKey==None:
+                        refKey=max([os.path.getmtime(os.path.join(refDir, name)) for name in os.listdir(refDir)]+[os.path.getmtime(refDir)])
+                    if not refDir in refCache or refCache[refDir][0]!=refKey:
+                        refCache[refDir]=(refKey, loadReference(refDir))
+                    ref=refCache[refDir][1]
+                retval=function(ref, rundir)
+            except SystemExit as e:
+                retval=e.code
+            except Exception:
+                traceback.print_exc()
+                return 1
+    if retval==None:
+        return 0
+    if isinstance(retval, int):
+        return retval
+    return 1
+
+
+class cmpPlugin:
+    """Python comparison plugin (module:function or file.py:function) used instead of the compare script.
+
+    function(ref, runDir) is called in a pool of processes which stays warm during the delta-debug session
+    and returns the exit code of the comparison (0 for success). If the module defines loadReference(refDir),
+    ref is its result, computed once per process ; otherwise ref is the reference directory."""
+
+    def __init__(self, entryPoint, nbProcess=1):
+        self.entryPoint=entryPoint
+        self.nbProcess=nbProcess
+        self.executor=None
+        self.lock=threading.Lock()
+
+    @staticmethod
+    def isEntryPoint(cmpCmd):
+        return cmpCmd!=None and ":" in os.path.basename(cmpCmd) and not os.path.isfile(cmpCmd)
+
+    def check(self):
+        """Return the error message if the plugin can not be loaded (None otherwise)"""
+        try:
+            loadCmpPlugin(self.entryPoint)
+        except Exception as e:
+            return "%s : %s"%(type(e).__name__, e)
+        return None
+
+    def submit(self, refDir, rundir, fname):
+        """Submit the comparison of rundir with refDir to the pool : the result of the future is the exit code"""
+        with self.lock:
+            if self.executor==None:
+                #spawn : the pool is created when the threads of the scheduler are already running
+                self.executor=concurrent.futures.ProcessPoolExecutor(max_workers=self.nbProcess, mp_context=multiprocessing.get_context("spawn"))
+        return self.executor.submit(callCmpPlugin, self.entryPoint, refDir, rundir, fname)
+
+    def compare(self, refDir, rundir, fname):
+        return self.submit(refDir, rundir, fname).result()
+
+    def shutdown(self):
+        if self.executor!=None:
+            self.executor.shutdown(wait=True)
+            self.executor=None
+
+
+class eventLog:
+    """JSON lines log of the events of a delta-debug session (--event-log).
+
+    The events are written by a thread : emit only blocks when maxSize events are waiting for the writer."""
+
+    def __init__(self, fileName, maxSize=10000):
+        self.queue=queue.Queue(maxsize=maxSize)
+        self.handler=open(fileName,"a")
+        self.thread=threading.Thread(target=self.write, daemon=True)
+        self.thread.start()
+
+    def emit(self, event, **fields):
+        record={"time":round(time.time(),3), "event":event}
+        record.update(fields)
+        self.queue.put(record)
+
+    def write(self):
+        while True:
+            record=self.queue.get()
+            if record==None:
+                break
+            self.handler.write(json.dumps(record)+"\n")
+            if self.queue.empty():
+                self.handler.flush()
+        self.handler.close()
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+
+
+class outcomeIndex:
+    """Single-file index of the sample outcomes of a cache directory (dd.sym, dd.line, ...).
+
+    The index is an append-only log : each line is 'md5Name sample kind value time' (tab separated)
+    with kind in "run" (exit code of the run script), "cmp" (exit code of the cmp script) or "cfg"
+    (configuration imported from the directory layout). The whole log is loaded in memory, so the
+    status of a configuration is available without any directory scan.
+
+    With fileName=None the index is only a ledger in memory : each configuration directory is scanned
+    once, then its samples are known without touching the filesystem. The number of runs launched is
+    also accounted by stage (see setStage).
+
+    If eventLog is set, the stages, the samples and the compare results are also emitted to the event log."""
+
+    def __init__(self, fileName, readOnly=False):
+        self.fileName=fileName
+        self.lock=threading.Lock()
+        self.data={}
+        self.runTime={}
+        self.stage=None
+        self.stageRun={}
+        self.eventLog=None
+        if fileName!=None and os.path.exists(fileName):
+            self.load()
+        self.handler=None
+        if fileName!=None and not readOnly:
+            self.handler=open(fileName,"a")
+
+    def load(self):
+        with open(self.fileName) as f:
+            for line in f:
+                tab=line.rstrip("\n").split("\t")
+                if len(tab)!=5:
+                    continue #incomplete line (killed during write)
+                try:
+                    self.update(tab[0], int(tab[1]), tab[2], int(tab[3]), float(tab[4]))
+                except ValueError:
+                    continue
+
+    def update(self, key, sample, kind, value, timeStamp):
+        if not key in self.data:
+            self.data[key]={}
+        if kind=="cfg":
+            return
+        samples=self.data[key]
+        if not sample in samples:
+            samples[sample]={}
+        samples[sample][kind]=value
+        if kind=="run":
+            self.runTime[(key,sample)]=timeStamp
+
+    def record(self, key, sample, kind, value, timeStamp=None):
+        if timeStamp==None:
+            timeStamp=time.time()
+        with self.lock:
+            self.update(key, sample, kind, value, timeStamp)
+            if self.handler!=None:
+                self.handler.write("%s\t%i\t%s\t%i\t%f\n"%(key, sample, kind, value, timeStamp))
+                self.handler.flush()
+
+    def isKnown(self, key):
+        return key in self.data
+
+    def emit(self, event, **fields):
+        if self.eventLog!=None:
+            self.eventLog.emit(event, **fields)
+
+    def setStage(self, stage):
+        """Set the name of the stage the next runs are accounted to"""
+        with self.lock:
+            if stage!=self.stage:
+                self.emit("stage", stage=stage)
+            self.stage=stage
+            if not stage in self.stageRun:
+                self.stageRun[stage]=0
+
+    def addStageRun(self, key=None, sample=None):
+        with self.lock:
+            self.emit("sample_start", config=key, sample=sample, stage=self.stage)
+            if self.stage!=None:
+                self.stageRun[self.stage]+=1
+
+    def nbStageRun(self):
+        """Return the number of runs accounted to all the stages"""
+        with self.lock:
+            return sum(self.stageRun.values())
+
+    def stageRunStr(self):
+        return "\n".join(["\t%s : %i"%(stage, self.stageRun[stage]) for stage in self.stageRun])
+
+    def importDir(self, key, dirname):
+        """Import the outcomes stored with the directory layout (dirname/dd.runN/dd.return.value)"""
+        if os.path.isdir(dirname):
+            for runDir in os.listdir(dirname):
+                if not runDir.startswith("dd.run"):
+                    continue
+                try:
+                    sample=int(runDir.replace("dd.run",""))
+                except ValueError:
+                    continue
+                runPath=os.path.join(dirname, runDir, "dd.run.out")
+                incompletePath=os.path.join(dirname, runDir, "dd.run.incomplete")
+                if os.path.exists(runPath) and not os.path.exists(incompletePath):
+                    self.record(key, sample, "run", 0, os.stat(runPath).st_mtime)
+                returnValuePath=os.path.join(dirname, runDir, "dd.return.value")
+                if os.path.exists(returnValuePath):
+                    self.record(key, sample, "cmp", int((open(returnValuePath).readline())))
+        self.record(key, -1, "cfg", 0)
+
+    def importPrefix(self, prefix):
+        """Import all the configurations of the prefix directory"""
+        for item in md5DirNames(prefix):
+            self.importDir(item, os.path.join(prefix,item))
+
+    def getSamples(self, key, dirname):
+        """Return the dict sample -> {kind: value} of the configuration key (imported from dirname if unknown)"""
+        if not key in self.data:
+            self.importDir(key, dirname)
+        with self.lock:
+            return {sample: dict(status) for (sample, status) in self.data[key].items()}
+
+    def countRun(self, start=None):
+        """Return the number of run recorded (after start if provided)"""
+        if start==None:
+            return len(self.runTime)
+        return len([t for t in self.runTime.values() if t > start])
+
+
+
+class sharedRunCache:
+    """Content-addressed cache of the sample runs, shared by all the tools (--shared-cache=DIR).
+
+    The key of a sample is the hash of the run script, of the VERROU_* environment (the files given as
+    values are replaced by the hash of their content, sorted for the lists of symbols or lines as the
+    order of the search space can change between tools) and of the sample index. An entry is a copy
+    of the run directory without the compare outputs, published with an atomic rename. The files are
+    copied (not hard linked) in both directions : a compare script rewriting a run output in place
+    would otherwise corrupt the entry."""
+
+    excluded=["dd.return.value", "dd.compare.out", "dd.compare.err", "dd.run.incomplete"]
+    statusName="dd.shared.status"
+    unorderedFileVars=["VERROU_EXCLUDE", "VERROU_SOURCE", "VERROU_WARN_UNKNOWN_SOURCE"]
+
+    def __init__(self, dirname):
+        self.dirname=os.path.abspath(dirname)
+        os.makedirs(self.dirname, exist_ok=True)
+        self.lock=threading.Lock()
+        self.fileHash={}
+        self.nbHit=0
+
+    def hashFile(self, path, unordered=False):
+        stat=os.stat(path)
+        with self.lock:
+            cached=self.fileHash.get((path,unordered))
+        if cached!=None and cached[0]==(stat.st_mtime, stat.st_size):
+            return cached[1]
+        h=hashlib.sha256()
+        with open(path,"rb") as f:
+            if unordered:
+                for line in sorted(set(f.read().splitlines())):
+                    h.update(line+b"\n")
+            else:
+                for block in iter(lambda: f.read(1<<20), b""):
+                    h.update(block)
+        with self.lock:
+            self.fileHash[(path,unordered)]=((stat.st_mtime, stat.st_size), h.hexdigest())
+        return h.hexdigest()
+
+    def key(self, runCmd, env, sample):
+        fullEnv={key:os.environ[key] for key in os.environ if key.startswith("VERROU_")}
+        fullEnv.update(env)
+        fullEnv={key:value for (key,value) in fullEnv.items() if value!=None}
+        h=hashlib.sha256()
+        h.update(("run=%s\n"%(self.hashFile(runCmd))).encode('utf-8'))
+        for key in sorted(fullEnv):
+            value=fullEnv[key]
+            if os.path.isfile(value):
+                value="file:"+self.hashFile(value, key in self.unorderedFileVars)
+            h.update(("%s=%s\n"%(key,value)).encode('utf-8'))
+        h.update(("sample=%i\n"%(sample)).encode('utf-8'))
+        return h.hexdigest()
+
+    def entryPath(self, key):
+        return os.path.join(self.dirname, key[0:2], key)
+
+    def fetch(self, key, rundir):
+        """Fill rundir with the entry key : return the exit code of the run script (None if the entry does not exist)"""
+        path=self.entryPath(key)
+        statusPath=os.path.join(path, self.statusName)
+        if not os.path.exists(statusPath):
+            return None
+        retval=int(open(statusPath).readline())
+        shutil.copytree(path, rundir, ignore=shutil.ignore_patterns(self.statusName), dirs_exist_ok=True)
+        with self.lock:
+            self.nbHit+=1
+        return retval
+
+    def publish(self, key, rundir, retval):
+        path=self.entryPath(key)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmpPath=tempfile.mkdtemp(dir=os.path.dirname(path), prefix="tmp.")
+        shutil.copytree(rundir, tmpPath, ignore=shutil.ignore_patterns(*self.excluded), dirs_exist_ok=True)
+        with open(os.path.join(tmpPath, self.statusName), "w") as f:
+            f.write(str(retval))
+        try:
+            os.rename(tmpPath, path)
+        except OSError:
+            #already published by a concurrent process
+            shutil.rmtree(tmpPath, ignore_errors=True)
+
+
+class baseScheduler:
+    """Bookkeeping of the futures shared by the schedulers (sampleScheduler, asyncioScheduler and queueScheduler).
+
+    The schedulers provide submitSample, submitCmpBatch and shutdown. Each future is registered with its
+    verrouTask : when cancelOnFail is set, a failing sample cancels the queued samples of the same task
+    and kills its running samples."""
+
+    def __init__(self):
+        self.lock=threading.Lock()
+        self.pending=set()
+
+    def _register(self, task, future, cancelOnFail):
+        with self.lock:
+            task.futures+=[future]
+            self.pending.add(future)
+        future.add_done_callback(self._unregister)
+        if cancelOnFail:
+            future.add_done_callback(lambda f: self._cancelIfFail(task, f))
+
+    def _unregister(self, future):
+        with self.lock:
+            self.pending.discard(future)
+
+    def cancelPending(self):
+        """Cancel all the queued samples"""
+        with self.lock:
+            futures=list(self.pending)
+        for future in futures:
+            future.cancel()
+
+    def _cancelIfFail(self, task, future):
+        if future.cancelled() or future.exception()!=None:
+            return
+        if future.result()==task.FAIL:
+            self.cancel(task)
+
+    def cancel(self, task):
+        """Cancel the queued samples of task and abort its running samples"""
+        with self.lock:
+            futures=list(task.futures)
+        for future in futures:
+            future.cancel()
+        task.abortRunning()
+
+
+class sampleScheduler(baseScheduler):
+    """Pool of threads shared by all the configurations tested during a delta-debug session.
+
+    Jobs are the samples (run and/or cmp) of the verrouTask objects."""
+
+    def __init__(self, maxNbPROC):
+        baseScheduler.__init__(self)
+        self.executor=concurrent.futures.ThreadPoolExecutor(max_workers=maxNbPROC)
+
+    def submit(self, task, fn, *args, cancelOnFail=False):
+        future=self.executor.submit(fn, *args)
+        self._register(task, future, cancelOnFail)
+        return future
+
+    def submitSample(self, task, sample, withRun=True, cancelOnFail=False):
+        """Submit the run (if withRun) and the comparison of sample : the result is PASS, FAIL or UNRESOLVED"""
+        if withRun:
+            return self.submit(task, task.runSeq, [sample], False, False, cancelOnFail=cancelOnFail)
+        return self.submit(task, task.cmpSeq, [sample], False, cancelOnFail=cancelOnFail)
+
+    def submitCmpBatch(self, task, samples):
+        """Submit the comparison of samples with a single call of the compare script (batch compare mode) : the result is the list of their results"""
+        return self.submit(task, task.cmpBatch, samples)
+
+    def shutdown(self, cancel=False):
+        """Wait the running samples (the queued samples are cancelled if cancel)"""
+        if cancel:
+            self.cancelPending()
+        self.executor.shutdown(wait=True)
+
+
+class sprtTest:
+    """Wald sequential probability ratio test of H0 : P(fail)=p0 against H1 : P(fail)=p1.
+
+    Both risks are equal to 1-confidence. The test is only used to stop early on PASS (H0 accepted) :
+    as without test, a configuration with a failing sample is FAIL. As only the samples without failure
+    are tested, the decision is not sequential : PASS is decided after a fixed number of successful
+    samples (nbSampleToPass(0)), so the test is equivalent to --nruns=min(nbSampleToPass(0), nbRun)."""
+
+    def __init__(self, p0, p1, confidence):
+        risk=1.-confidence
+        self.lower=math.log(risk/(1.-risk))
+        self.passStep=math.log((1.-p1)/(1.-p0))
+
+    def logLikelihoodRatio(self, nbPass):
+        """Return the log likelihood ratio of nbPass successful samples (without failing sample)"""
+        return nbPass*self.passStep
+
+    def decide(self, nbPass, nbFail):
+        """Return FAIL, PASS or None (more samples are needed)"""
+        if nbFail!=0:
+            return DD.DD.FAIL
+        if self.logLikelihoodRatio(nbPass)<=self.lower:
+            return DD.DD.PASS
+        return None
+
+    def nbSampleToPass(self, nbPass):
+        """Return the number of additional successful samples required to decide PASS"""
+        return max(1, int(math.ceil((self.lower-self.logLikelihoodRatio(nbPass))/self.passStep)))
+
+
+class asyncioScheduler(baseScheduler):
+    """Same interface as sampleScheduler, but the samples are coroutines (verrouTask.asyncSample) of a
+    single event loop (run in a dedicated thread) : the concurrency is bounded by a semaphore instead
+    of a pool of threads blocked in Popen.wait().
+
+    The blocking filesystem work of the samples (preparation of the run directories, fetch and publish
+    of the shared cache) is done by the threads of fsExecutor, to keep the event loop responsive."""
+
+    def __init__(self, maxNbPROC):
+        baseScheduler.__init__(self)
+        self.fsExecutor=concurrent.futures.ThreadPoolExecutor(max_workers=maxNbPROC)
+        self.loop=asyncio.new_event_loop()
+        #strong references to the running jobs (the event loop only keeps weak references to its tasks)
+        self.jobTasks=set()
+        self.thread=threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        async def createSemaphore():
+            return asyncio.Semaphore(maxNbPROC)
+        self.semaphore=asyncio.run_coroutine_threadsafe(createSemaphore(), self.loop).result()
+
+    def submitSample(self, task, sample, withRun=True, cancelOnFail=False):
+        return self._submitJob(task, lambda : task.asyncSample(sample, withRun, self.fsExecutor), cancelOnFail)
+
+    def submitCmpBatch(self, task, samples):
+        return self._submitJob(task, lambda : task.asyncCmpBatch(samples), False)
+
+    def _submitJob(self, task, coroutine, cancelOnFail):
+        future=concurrent.futures.Future()
+        self._register(task, future, cancelOnFail)
+        self.loop.call_soon_threadsafe(self._createJobTask, future, coroutine)
+        return future
+
+    def _createJobTask(self, future, coroutine):
+        jobTask=self.loop.create_task(self._job(future, coroutine))
+        self.jobTasks.add(jobTask)
+        jobTask.add_done_callback(self.jobTasks.discard)
+
+    async def _job(self, future, coroutine):
+        if future.cancelled():
+            return
+        async with self.semaphore:
+            #as with a ThreadPoolExecutor, a running job can not be cancelled (its processes are killed by task.abortRunning)
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                res=await coroutine()
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(res)
+
+    def shutdown(self, cancel=False):
+        if cancel:
+            self.cancelPending()
+            async def cancelJobs():
+                jobs=list(self.jobTasks)
+                for job in jobs:
+                    job.cancel()
+                await asyncio.gather(*jobs, return_exceptions=True)
+            asyncio.run_coroutine_threadsafe(cancelJobs(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+        self.fsExecutor.shutdown(wait=True)
+
+
+def verrouEnvironment():
+    """Return the VERROU_* variables of the current environment (without the VERROU_DD_* variables)"""
+    return {key:value for (key,value) in os.environ.items() if key.startswith("VERROU_") and not key.startswith("VERROU_DD_")}
+
+
+class queueScheduler(baseScheduler):
+    """Same interface as sampleScheduler, but the samples are published as jobs in a queue directory
+    (on a shared filesystem) and are run by verrou_dd_worker processes (see queueWorker).
+
+    queueDir/pending contains the published jobs, claimed by the workers with an atomic rename to
+    queueDir/running. The results are written in the usual dd.runN directories and summarized in
+    queueDir/done. A claimed job is aborted through a file in queueDir/abort. The workers refresh the
+    modification time of their claimed jobs (heartbeat) : a claimed job without heartbeat during
+    leaseTimeout seconds (the worker was killed) is moved back to queueDir/pending.
+
+    The VERROU_* environment of the coordinator (verrou options, without the VERROU_DD_* variables) is
+    captured at the creation of the scheduler and sent with every job : the workers run the samples
+    with this environment instead of their own."""
+
+    pollDelay=0.2
+    leaseTimeout=60.
+
+    def __init__(self, queueDir):
+        baseScheduler.__init__(self)
+        self.queueDir=os.path.abspath(queueDir)
+        for subDir in ["pending", "running", "done", "abort"]:
+            os.makedirs(os.path.join(self.queueDir, subDir), exist_ok=True)
+        self.jobs={}
+        self.leases={}
+        self.counter=0
+        self.jobPrefix="%s-%i"%(socket.gethostname(), os.getpid())
+        self.verrouEnv=verrouEnvironment()
+        self.stopped=False
+        self.thread=threading.Thread(target=self._poll, daemon=True)
+        self.thread.start()
+
+    def submitSample(self, task, sample, withRun=True, cancelOnFail=False):
+        return self._publish(task, {"sample": sample, "withRun": withRun, "cmpBatch": None}, cancelOnFail)
+
+    def submitCmpBatch(self, task, samples):
+        return self._publish(task, {"sample": None, "withRun": False, "cmpBatch": samples}, False)
+
+    def _publish(self, task, job, cancelOnFail):
+        future=concurrent.futures.Future()
+        self._register(task, future, cancelOnFail)
+        limits=task.limits
+        job.update({"dirname": task.dirname, "refDir": task.refDir, "runCmd": task.runCmd, "cmpCmd": task.cmpCmd,
+                    "verrouEnv": self.verrouEnv, "env": task.runEnv, "cmpEnv": task.cmpEnv, "batchCompare": task.batchCompare,
+                    "limits": [limits.timeout, limits.memory, limits.cpu, limits.policy],
+                    "sharedCache": None if task.sharedCache==None else task.sharedCache.dirname})
+        with self.lock:
+            self.counter+=1
+            name="%s-%i.json"%(self.jobPrefix, self.counter)
+            self.jobs[name]=(future, task, job)
+        tmpPath=os.path.join(self.queueDir, "pending", "."+name)
+        with open(tmpPath, "w") as f:
+            json.dump(job, f)
+        os.rename(tmpPath, os.path.join(self.queueDir, "pending", name))
+        return future
+
+    def cancel(self, task):
+        """Remove the pending jobs of task and ask the workers to abort its claimed jobs"""
+        with self.lock:
+            names=[name for name in self.jobs if self.jobs[name][1] is task]
+        for name in names:
+            try:
+                os.remove(os.path.join(self.queueDir, "pending", name))
+            except FileNotFoundError:
+                #already claimed by a worker
+                open(os.path.join(self.queueDir, "abort", name), "w").close()
+                continue
+            with self.lock:
+                future=self.jobs.pop(name)[0]
+            #as for an executor, the waiters of concurrent.futures.wait are only notified by set_running_or_notify_cancel
+            future.cancel()
+            future.set_running_or_notify_cancel()
+        task.abortRunning()
+
+    def _poll(self):
+        while not self.stopped:
+            for name in os.listdir(os.path.join(self.queueDir, "done")):
+                with self.lock:
+                    known=name in self.jobs
+                if known:
+                    self._complete(name)
+                elif name.startswith(self.jobPrefix+"-"):
+                    #second result of a requeued job
+                    os.remove(os.path.join(self.queueDir, "done", name))
+            self._checkLeases()
+            time.sleep(self.pollDelay)
+
+    def _checkLeases(self):
+        """Move back to pending the claimed jobs without heartbeat during leaseTimeout seconds"""
+        now=time.monotonic()
+        with self.lock:
+            names=list(self.jobs)
+        for name in names:
+            runningPath=os.path.join(self.queueDir, "running", name)
+            try:
+                mtime=os.stat(runningPath).st_mtime
+            except FileNotFoundError:
+                self.leases.pop(name, None)
+                continue
+            #the modification times are only compared with each other (no clock synchronization is required)
+            lease=self.leases.get(name)
+            if lease==None or lease[0]!=mtime:
+                self.leases[name]=(mtime, now)
+            elif now-lease[1] > self.leaseTimeout:
+                print("Warning : no heartbeat for the job %s since %is : job requeued"%(name, self.leaseTimeout))
+                self.leases.pop(name)
+                with self.lock:
+                    (future, task, job)=self.jobs[name]
+                if job["withRun"] and os.path.isdir(task.nameDir(job["sample"])):
+                    task.markIncomplete(job["sample"])
+                try:
+                    os.rename(runningPath, os.path.join(self.queueDir, "pending", name))
+                except FileNotFoundError:
+                    pass
+
+    def _complete(self, name):
+        donePath=os.path.join(self.queueDir, "done", name)
+        with open(donePath) as f:
+            res=json.load(f)
+        os.remove(donePath)
+        for subDir in ["abort", "pending"]:
+            #pending : requeued job already completed by its first worker
+            path=os.path.join(self.queueDir, subDir, name)
+            if os.path.exists(path):
+                os.remove(path)
+        self.leases.pop(name, None)
+        with self.lock:
+            (future, task, job)=self.jobs.pop(name)
+        if "error" in res:
+            print("Warning : the job %s failed on its worker (%s)"%(name, res["error"].strip().splitlines()[-1]))
+            if job["cmpBatch"]!=None:
+                res={"result": [task.UNRESOLVED]*len(job["cmpBatch"]), "samples": []}
+            else:
+                if job["withRun"] and os.path.isdir(task.nameDir(job["sample"])):
+                    task.markIncomplete(job["sample"])
+                res={"result": task.UNRESOLVED, "samples": []}
+        if task.index!=None:
+            for (sample, runRetval, cmpRetval) in res["samples"]:
+                if runRetval!=None:
+                    task.index.record(task.key, sample, "run", runRetval)
+                    task.index.addStageRun(task.key, sample)
+                    task.index.emit("sample_end", config=task.key, sample=sample, exit=runRetval)
+                if cmpRetval!=None:
+                    task.index.record(task.key, sample, "cmp", cmpRetval)
+                    task.index.emit("cmp", config=task.key, sample=sample, exit=cmpRetval)
+        if not future.cancelled():
+            future.set_result(res["result"])
+
+    def shutdown(self, cancel=False):
+        self.stopped=True
+        self.thread.join()
+        if cancel:
+            with self.lock:
+                names=list(self.jobs)
+            for name in names:
+                if os.path.exists(os.path.join(self.queueDir, "pending", name)):
+                    os.remove(os.path.join(self.queueDir, "pending", name))
+                else:
+                    open(os.path.join(self.queueDir, "abort", name), "w").close()
+
+
+class queueWorker:
+    """Worker of a queueScheduler : claim the jobs of queueDir/pending and run them (verrou_dd_worker)"""
+
+    pollDelay=0.2
+    heartbeatDelay=10.
+
+    def __init__(self, queueDir, nbThread=1, idleTimeout=None):
+        self.queueDir=os.path.abspath(queueDir)
+        for subDir in ["pending", "running", "done", "abort"]:
+            os.makedirs(os.path.join(self.queueDir, subDir), exist_ok=True)
+        self.nbThread=nbThread
+        self.idleTimeout=idleTimeout
+        self.executor=concurrent.futures.ThreadPoolExecutor(max_workers=nbThread)
+        self.lock=threading.Lock()
+        self.running={}
+        self.cmpPlugins={}
+
+    def getCmpPlugin(self, cmpCmd):
+        """Return the comparison plugin of cmpCmd (None for a compare script) : its pool is shared by the jobs"""
+        if not cmpPlugin.isEntryPoint(cmpCmd):
+            return None
+        with self.lock:
+            if not cmpCmd in self.cmpPlugins:
+                self.cmpPlugins[cmpCmd]=cmpPlugin(cmpCmd, self.nbThread)
+            return self.cmpPlugins[cmpCmd]
+
+    def claim(self):
+        """Return the name of a claimed job (None if the queue is empty)"""
+        for name in sorted(os.listdir(os.path.join(self.queueDir, "pending"))):
+            if name.startswith("."):
+                continue
+            try:
+                os.rename(os.path.join(self.queueDir, "pending", name), os.path.join(self.queueDir, "running", name))
+                self.heartbeat([name])
+                return name
+            except FileNotFoundError:
+                continue
+        return None
+
+    def runJob(self, name):
+        """Run the claimed job name and publish its result in queueDir/done (the traceback if the job failed)"""
+        runningPath=os.path.join(self.queueDir, "running", name)
+        try:
+            res=self.executeJob(name, runningPath)
+        except Exception:
+            traceback.print_exc()
+            res={"error": traceback.format_exc()}
+        tmpPath=os.path.join(self.queueDir, "done", "."+name)
+        with open(tmpPath, "w") as f:
+            json.dump(res, f)
+        os.rename(tmpPath, os.path.join(self.queueDir, "done", name))
+        try:
+            os.remove(runningPath)
+        except FileNotFoundError:
+            #requeued by the coordinator
+            pass
+
+    def executeJob(self, name, runningPath):
+        with open(runningPath) as f:
+            job=json.load(f)
+        sharedCache=None
+        if job["sharedCache"]!=None:
+            sharedCache=sharedRunCache(job["sharedCache"])
+        index=outcomeIndex(None)
+        #the verrou options of the coordinator replace the ones of the worker
+        env={key:None for key in verrouEnvironment()}
+        env.update(job["verrouEnv"])
+        env.update(job["env"])
+        task=verrouTask(job["dirname"], job["refDir"], job["runCmd"], job["cmpCmd"], None, None, env,
+                        verbose=False, index=index, sharedCache=sharedCache, limits=runLimits(*job["limits"]),
+                        batchCompare=job["batchCompare"], cmpPlugin=self.getCmpPlugin(job["cmpCmd"]), cmpEnv=job["cmpEnv"])
+        with self.lock:
+            self.running[name]=task
+        try:
+            if job["cmpBatch"]!=None:
+                samples=job["cmpBatch"]
+                result=task.cmpBatch(samples)
+            elif job["withRun"]:
+                samples=[job["sample"]]
+                result=task.runSeq(samples, False)
+            else:
+                samples=[job["sample"]]
+                result=task.cmpSeq(samples, False)
+        finally:
+            with self.lock:
+                self.running.pop(name)
+        statusTab=index.getSamples(task.key, task.dirname)
+        #the runs of a batch compare are already known by the coordinator
+        res={"result": result,
+             "samples": [[sample, None if job["cmpBatch"]!=None else statusTab.get(sample, {}).get("run"), statusTab.get(sample, {}).get("cmp")] for sample in samples]}
+        for (sample, sampleResult) in zip(samples, result if job["cmpBatch"]!=None else [result]):
+            print(os.path.relpath(os.path.join(task.dirname, "dd.run%i"%(sample))) + " -> " + sampleResult, flush=True)
+        return res
+
+    def heartbeat(self, names):
+        """Refresh the modification time of the claimed jobs names (their lease)"""
+        for name in names:
+            try:
+                os.utime(os.path.join(self.queueDir, "running", name))
+            except FileNotFoundError:
+                pass
+
+    def checkAbort(self):
+        with self.lock:
+            running=dict(self.running)
+        for name in running:
+            if os.path.exists(os.path.join(self.queueDir, "abort", name)):
+                running[name].abortRunning()
+
+    def loop(self):
+        """Claim and run jobs until queueDir/stop exists (or idleTimeout seconds without job)"""
+        claimed={}
+        lastJob=time.time()
+        lastHeartbeat=time.time()
+        try:
+            while not os.path.exists(os.path.join(self.queueDir, "stop")):
+                claimed={name:future for (name,future) in claimed.items() if not future.done()}
+                self.checkAbort()
+                if time.time()-lastHeartbeat > self.heartbeatDelay:
+                    self.heartbeat(list(claimed))
+                    lastHeartbeat=time.time()
+                while len(claimed) < self.nbThread:
+                    name=self.claim()
+                    if name==None:
+                        break
+                    claimed[name]=self.executor.submit(self.runJob, name)
+                if len(claimed)!=0:
+                    lastJob=time.time()
+                elif self.idleTimeout!=None and time.time()-lastJob > self.idleTimeout:
+                    break
+                time.sleep(self.pollDelay)
+        except KeyboardInterrupt:
+            killRunningProcesses()
+            raise
+        finally:
+            self.executor.shutdown(wait=True)
+            for plugin in self.cmpPlugins.values():
+                plugin.shutdown()
+
+
+def batchCmpStatus(fname, nbSample, retval):
+    """Return the nbSample return values printed (one per line) in fname by the compare script in batch compare mode.
+
+    The lines which are not integers are ignored and the missing values (compare script failure) are
+    replaced by retval (1 if retval is 0)."""
+    retvalTab=[]
+    if os.path.exists(fname):
+        for line in open(fname):
+            try:
+                retvalTab+=[int(line)]
+            except ValueError:
+                continue
+    if len(retvalTab)!=nbSample:
+        print("Warning : %s contains %i return values instead of %i"%(fname, len(retvalTab), nbSample))
+    missingRetval=retval if retval!=0 else 1
+    return (retvalTab+[missingRetval]*nbSample)[:nbSample]
+
+
+def futureResults(futures):
+    """Return the results of futures (None for cancelled futures)"""
+    return [None if future.cancelled() else future.result() for future in futures]
+
+
+
 class verrouTask:
 
-    def __init__(self, dirname, refDir,runCmd, cmpCmd,nbRun, maxNbPROC, runEnv , verbose=True):
+    def __init__(self, dirname, refDir,runCmd, cmpCmd,nbRun, maxNbPROC, runEnv , verbose=True, index=None, scheduler=None, statTest=None, sharedCache=None, limits=None, batchCompare=False, cmpPlugin=None, cmpEnv=None):
         self.dirname=dirname
         self.refDir=refDir
         self.runCmd=runCmd
@@ -79,8 +1185,12 @@ class verrouTask:
         self.nbRun=nbRun
         self.FAIL=DD.DD.FAIL
         self.PASS=DD.DD.PASS
+        self.UNRESOLVED=DD.DD.UNRESOLVED
 
         self.subProcessRun={}
+        self.subProcessLock=threading.Lock()
+        self.aborted=False
+        self.killed=set()
         self.maxNbPROC= maxNbPROC
         self.runEnv=runEnv
         self.verbose=verbose
@@ -88,6 +1198,23 @@ class verrouTask:
         self.pathToPrint=os.path.relpath(self.dirname, os.getcwd())
         self.preRunLambda=None
         self.postRunLambda=None
+        self.index=index
+        self.key=os.path.basename(self.dirname)
+        self.scheduler=scheduler
+        self.futures=[]
+        self.statTest=statTest
+        self.sharedCache=sharedCache
+        self.limits=limits
+        if self.limits==None:
+            self.limits=runLimits()
+        self.timedOut=set()
+        self.sharedKey={}
+        self.sharedRun={}
+        self.statNbPass=0
+        self.statNbFail=0
+        self.batchCompare=batchCompare
+        self.cmpPlugin=cmpPlugin
+        self.cmpEnv=cmpEnv
 
     def setPostRun(self, postLambda):
         self.postRunLambda=postLambda
@@ -107,15 +1234,169 @@ class verrouTask:
     def rmdir(self,i):
         shutil.rmtree(self.nameDir(i))
 
-    def runOneSample(self,i):
+    def prepareDir(self, i):
+        if not os.path.exists(self.nameDir(i)):
+            self.mkdir(i)
+        elif not os.path.exists(os.path.join(self.nameDir(i), "dd.run.incomplete")):
+            print("Manual cache modification detected (runSeq)")
+
+    def prepareRun(self, i):
+        """Prepare the run of sample i : return the environment of the run script (None if the run script has not to be launched)"""
         rundir= self.nameDir(i)
         env={key:self.runEnv[key] for key in self.runEnv}
         if self.preRunLambda!=None:
             self.preRunLambda(rundir, env)
-        self.subProcessRun[i]=runCmdAsync([self.runCmd, rundir],
-                                          os.path.join(rundir,"dd.run"),
-                                          env)
+        for name in ["dd.run.incomplete", "dd.run.status"]:
+            if os.path.exists(os.path.join(rundir,name)):
+                os.remove(os.path.join(rundir,name))
+        if self.sharedCache!=None and self.preRunLambda==None and self.postRunLambda==None:
+            key=self.sharedCache.key(self.runCmd, env, i)
+            retval=self.sharedCache.fetch(key, rundir)
+            with self.subProcessLock:
+                if retval!=None:
+                    self.subProcessRun[i]=None
+                    self.sharedRun[i]=retval
+                    return None
+                self.sharedKey[i]=key
+        with self.subProcessLock:
+            if self.aborted:
+                self.subProcessRun[i]=None
+                self.killed.add(i)
+                return None
+        return env
+
+    def runOneSample(self,i):
+        env=self.prepareRun(i)
+        if env==None:
+            return
+        rundir= self.nameDir(i)
+        with self.subProcessLock:
+            if self.aborted:
+                self.subProcessRun[i]=None
+                self.killed.add(i)
+                return
+            self.subProcessRun[i]=runCmdAsync(self.limits.wrap([self.runCmd, rundir]),
+                                              os.path.join(rundir,"dd.run"),
+                                              env)
+        if self.index!=None:
+            self.index.addStageRun(self.key, i)
+
+    def prepareSample(self, i):
+        self.prepareDir(i)
+        return self.prepareRun(i)
+
+    async def asyncSample(self, i, withRun=True, fsExecutor=None):
+        """Coroutine equivalent of runSeq([i],False) (cmpSeq([i],False) if not withRun) used by asyncioScheduler.
+
+        The blocking filesystem work (prepareRun and finalizeRun, with the shared cache) is run in fsExecutor."""
+        loop=asyncio.get_event_loop()
+        rundir= self.nameDir(i)
+        if withRun:
+            env=await loop.run_in_executor(fsExecutor, self.prepareSample, i)
+            runRetval=None
+            if env!=None:
+                subProcess=await runCmdAsyncio(self.limits.wrap([self.runCmd, rundir]), os.path.join(rundir,"dd.run"), env)
+                with self.subProcessLock:
+                    self.subProcessRun[i]=subProcess
+                    if self.aborted:
+                        #aborted during the launch
+                        self.killed.add(i)
+                        killProcessGroup(subProcess)
+                if self.index!=None:
+                    self.index.addStageRun(self.key, i)
+                runRetval=await getResultAsyncio(subProcess, self.limits.timeout)
+                if runRetval==None:
+                    self.timedOut.add(i)
+                    runRetval=subProcess.returncode
+            if self.refDir==None:
+                return self.PASS
+            status=await loop.run_in_executor(fsExecutor, self.finalizeRun, i, runRetval)
+            if status!=None:
+                return status
+            if self.batchCompare:
+                #compared later by cmpBatch
+                return self.PASS
+        elif self.refDir==None:
+            return self.PASS
+        if self.cmpPlugin!=None:
+            retval=await asyncio.wrap_future(self.cmpPlugin.submit(self.refDir, rundir, os.path.join(rundir,"dd.compare")))
+            return self.finalizeCmp(i, retval)
+        subProcess=await runCmdAsyncio([self.cmpCmd, self.refDir, rundir], os.path.join(rundir,"dd.compare"), self.cmpEnv)
+        retval=await getResultAsyncio(subProcess)
+        return self.finalizeCmp(i, retval)
+
+    def abortRunning(self):
+        """Kill the process groups of the running samples : the killed samples are marked as incomplete"""
+        with self.subProcessLock:
+            self.aborted=True
+            for i in self.subProcessRun:
+                subProcess=self.subProcessRun[i]
+                if subProcess!=None and isRunning(subProcess):
+                    self.killed.add(i)
+                    killProcessGroup(subProcess)
+
+    def markIncomplete(self,i):
+        with open(os.path.join(self.nameDir(i), "dd.run.incomplete"),"w") as f:
+            f.write("killed\n")
+
+
+    def finalizeRun(self, i, runRetval):
+        """Post-treatment of the run of sample i (runRetval is None if the run script was not launched) : return UNRESOLVED if the comparison has to be skipped, None otherwise"""
+        rundir= self.nameDir(i)
+        if runRetval!=None:
+            if self.index!=None:
+                self.index.emit("sample_end", config=self.key, sample=i, exit=runRetval, killed=(i in self.killed), **self.sampleCost(i))
+            if i in self.killed:
+                self.markIncomplete(i)
+                return self.UNRESOLVED
+            limitStatus=self.limits.status(rundir, None if i in self.timedOut else runRetval,
+                                           getattr(self.subProcessRun.get(i), "rusage", None))
+            if limitStatus!=None:
+                return self.limitExceeded(i, limitStatus, runRetval)
+            if self.postRunLambda!=None:
+                self.postRunLambda(rundir)
+            if self.index!=None:
+                self.index.record(self.key, i, "run", runRetval)
+                self.recordCost(i)
+            if i in self.sharedKey:
+                self.sharedCache.publish(self.sharedKey[i], rundir, runRetval)
+        elif i in self.sharedRun:
+            if self.index!=None:
+                self.index.record(self.key, i, "run", self.sharedRun[i])
+        elif i in self.killed:
+            return self.UNRESOLVED
+        if self.aborted:
+            #the run is complete but the compare is useless
+            return self.UNRESOLVED
+        return None
 
+    def sampleCost(self, i):
+        """Return the wall time (s) and the maximum resident set size (kB) of the run of sample i (None if unknown)"""
+        subProcess=self.subProcessRun.get(i)
+        rusage=getattr(subProcess, "rusage", None)
+        return {"wall":getattr(subProcess, "wallTime", None),
+                "rss":None if rusage==None else rusage.ru_maxrss}
+
+    def recordCost(self, i):
+        """Record the wall time (ms) and the maximum resident set size (kB) of the run of sample i"""
+        cost=self.sampleCost(i)
+        if cost["wall"]!=None:
+            self.index.record(self.key, i, "wall", int(cost["wall"]*1000))
+        if cost["rss"]!=None:
+            self.index.record(self.key, i, "rss", cost["rss"])
+
+    def limitExceeded(self, i, limitStatus, runRetval):
+        """Apply the policy to the sample i which exceeded a limit : FAIL (cached) or UNRESOLVED (run again later)"""
+        rundir= self.nameDir(i)
+        with open(os.path.join(rundir, "dd.run.status"),"w") as f:
+            f.write(limitStatus+"\n")
+        if self.limits.policy=="unresolved":
+            with open(os.path.join(rundir, "dd.run.incomplete"),"w") as f:
+                f.write(limitStatus+"\n")
+            return self.UNRESOLVED
+        if self.index!=None:
+            self.index.record(self.key, i, "run", runRetval)
+        return self.finalizeCmp(i, runLimits.statusRetval[limitStatus])
 
     def cmpOneSample(self,i, assertRun=True):
         if self.refDir==None: #if there are no reference provided cmp is ignored
@@ -123,15 +1404,69 @@ class verrouTask:
 
         rundir= self.nameDir(i)
         if assertRun:
+            runRetval=None
             if self.subProcessRun[i]!=None:
-                getResult(self.subProcessRun[i])
-                if self.postRunLambda!=None:
-                    self.postRunLambda(rundir)
-        retval = runCmd([self.cmpCmd, self.refDir, rundir],
-                        os.path.join(rundir,"dd.compare"))
-
+                runRetval=getResult(self.subProcessRun[i], self.limits.timeout)
+                if runRetval==None:
+                    self.timedOut.add(i)
+                    runRetval=self.subProcessRun[i].returncode
+            status=self.finalizeRun(i, runRetval)
+            if status!=None:
+                return status
+            if self.batchCompare:
+                #compared later by cmpBatch
+                return self.PASS
+        if self.cmpPlugin!=None:
+            retval=self.cmpPlugin.compare(self.refDir, rundir, os.path.join(rundir,"dd.compare"))
+        else:
+            retval = runCmd([self.cmpCmd, self.refDir, rundir],
+                            os.path.join(rundir,"dd.compare"), self.cmpEnv)
+        return self.finalizeCmp(i, retval)
+
+    def cmpBatch(self, workToDo):
+        """Compare the samples of workToDo with a single call of the compare script (batch compare mode) : return their results"""
+        if self.refDir==None:
+            return [self.PASS]*len(workToDo)
+        if len(workToDo)==0:
+            return []
+        if self.cmpPlugin!=None:
+            #no need of the batch protocol : the samples are compared by the pool of the plugin
+            futures=[self.cmpPlugin.submit(self.refDir, self.nameDir(i), os.path.join(self.nameDir(i),"dd.compare")) for i in workToDo]
+            return [self.finalizeCmp(i, future.result()) for (i, future) in zip(workToDo, futures)]
+        retval = runCmd([self.cmpCmd, self.refDir]+[self.nameDir(i) for i in workToDo],
+                        os.path.join(self.dirname,"dd.compare.batch"), self.cmpEnv)
+        return self.finalizeCmpBatch(workToDo, retval)
+
+    async def asyncCmpBatch(self, workToDo):
+        """Coroutine equivalent of cmpBatch used by asyncioScheduler"""
+        if self.refDir==None:
+            return [self.PASS]*len(workToDo)
+        if len(workToDo)==0:
+            return []
+        if self.cmpPlugin!=None:
+            futures=[asyncio.wrap_future(self.cmpPlugin.submit(self.refDir, self.nameDir(i), os.path.join(self.nameDir(i),"dd.compare"))) for i in workToDo]
+            return [self.finalizeCmp(i, retval) for (i, retval) in zip(workToDo, await asyncio.gather(*futures))]
+        subProcess=await runCmdAsyncio([self.cmpCmd, self.refDir]+[self.nameDir(i) for i in workToDo], os.path.join(self.dirname,"dd.compare.batch"), self.cmpEnv)
+        retval=await getResultAsyncio(subProcess)
+        return self.finalizeCmpBatch(workToDo, retval)
+
+    def finalizeCmpBatch(self, workToDo, retval):
+        retvalTab=batchCmpStatus(os.path.join(self.dirname,"dd.compare.batch.out"), len(workToDo), retval)
+        return [self.finalizeCmp(i, sampleRetval) for (i, sampleRetval) in zip(workToDo, retvalTab)]
+
+    def cmpDeferred(self, workToDo, results):
+        """Batch compare mode : compare the samples of workToDo whose run is complete (result PASS) and return the updated results"""
+        toCmp=[work for (work, res) in zip(workToDo, results) if res==self.PASS]
+        cmpResults=dict(zip(toCmp, self.cmpBatch(toCmp)))
+        return [cmpResults.get(work, res) for (work, res) in zip(workToDo, results)]
+
+    def finalizeCmp(self, i, retval):
+        rundir= self.nameDir(i)
         with open(os.path.join(rundir, "dd.return.value"),"w") as f:
             f.write(str(retval))
+        if self.index!=None:
+            self.index.record(self.key, i, "cmp", retval)
+            self.index.emit("cmp", config=self.key, sample=i, exit=retval)
         if retval != 0:
             self.alreadyFail=True
 #            if self.verbose:
@@ -144,6 +1479,11 @@ class verrouTask:
 
     def sampleToCompute(self, nbRun, earlyExit):
         """Return the two lists of samples which have to be compared or computed (and compared) to perforn nbRun Success run : None means Failure ([],[]) means Success """
+        if self.index!=None:
+            workToDo=self.sampleToComputeFromIndex(nbRun, earlyExit)
+            #the samples already run are cache hits
+            self.index.emit("config", config=self.key, nbRun=nbRun, cached=nbRun if workToDo==None else nbRun-len(workToDo[1]))
+            return workToDo
         listOfDirString=[runDir for runDir in os.listdir(self.dirname) if runDir.startswith("dd.run")]
         listOfDirIndex=[ int(x.replace("dd.run",""))  for x in listOfDirString  ]
 
@@ -161,14 +1501,77 @@ class verrouTask:
                 cmpDone+=[int(runDir.replace("dd.run",""))]
             else:
                 runPath=os.path.join(self.dirname, runDir, "dd.run.out")
-                if os.path.exists(runPath):
+                incompletePath=os.path.join(self.dirname, runDir, "dd.run.incomplete")
+                if os.path.exists(runPath) and not os.path.exists(incompletePath):
                     runDone+=[int(runDir.replace("dd.run",""))]
 
         workToRun= [x for x in range(nbRun) if (((not x in runDone+cmpDone) and (x in listOfDirIndex )) or (not (x in listOfDirIndex))) ]
         return (runDone, workToRun, cmpDone)
 
+    def sampleToComputeFromIndex(self, nbRun, earlyExit):
+        """Same as sampleToCompute but answered by the outcome index"""
+        samples=self.index.getSamples(self.key, self.dirname)
+        cmpDone=[]
+        runDone=[]
+        for sample in sorted(samples):
+            status=samples[sample]
+            if "cmp" in status:
+                if status["cmp"]!=0:
+                    if earlyExit:
+                        return None
+                cmpDone+=[sample]
+            elif "run" in status:
+                runDone+=[sample]
+        workToRun= [x for x in range(nbRun) if not x in samples]
+        return (runDone, workToRun, cmpDone)
+
+    def cmpStatus(self):
+        """Return the dict sample -> return value of the compared samples"""
+        if self.index!=None:
+            samples=self.index.getSamples(self.key, self.dirname)
+            return {sample: samples[sample]["cmp"] for sample in samples if "cmp" in samples[sample]}
+        res={}
+        for runDir in os.listdir(self.dirname):
+            if not runDir.startswith("dd.run"):
+                continue
+            returnValuePath=os.path.join(self.dirname, runDir, "dd.return.value")
+            if os.path.exists(returnValuePath):
+                res[int(runDir.replace("dd.run",""))]=int((open(returnValuePath).readline()))
+        return res
+
+    def statInit(self):
+        """Initialize the counters of the statistical test with the compared samples"""
+        status=self.cmpStatus()
+        self.statNbFail=len([x for x in status.values() if x!=0])
+        self.statNbPass=len(status)-self.statNbFail
+
+    def statUpdate(self, results):
+        self.statNbPass+=results.count(self.PASS)
+        self.statNbFail+=results.count(self.FAIL)
+
+    def statDecision(self, nbRemaining):
+        """Return the decision of the statistical test : None if it needs more samples and nbRemaining!=0"""
+        decision=self.statTest.decide(self.statNbPass, self.statNbFail)
+        if decision==None and nbRemaining==0:
+            #nbRun is reached : fallback to the default decision
+            decision=self.FAIL if self.statNbFail!=0 else self.PASS
+        return decision
+
+    def statBatchSize(self, nbProc):
+        return min(self.statTest.nbSampleToPass(self.statNbPass), nbProc)
+
+    def statSaved(self):
+        return max(self.nbRun-(self.statNbPass+self.statNbFail), 0)
+
+    def statStr(self):
+        return "(%i samples, %i saved)"%(self.statNbPass+self.statNbFail, self.statSaved())
+
     def getEstimatedFailProbability(self):
         """Return an estimated probablity of fail for the configuration"""
+        if self.index!=None:
+            cmpTab=[status["cmp"] for status in self.index.getSamples(self.key, self.dirname).values() if "cmp" in status]
+            return float(len([x for x in cmpTab if x!=0])) / float(len(cmpTab))
+
         listOfDirString=[runDir for runDir in os.listdir(self.dirname) if runDir.startswith("dd.run")]
         listOfDirIndex=[ int(x.replace("dd.run",""))  for x in listOfDirString  ]
 
@@ -184,6 +1587,8 @@ class verrouTask:
         return cacheFail / cacheCounter
 
     def run(self, earlyExit=True):
+        if self.statTest!=None and earlyExit:
+            return self.runStatTest()
         if self.verbose:
             self.printDir()
 
@@ -213,13 +1618,17 @@ class verrouTask:
 
         if len(runToDo)!=0:
 
-            if self.maxNbPROC==None:
+            if self.batchCompare:
+                returnVal=self.runCmpBatch(runToDo)
+            elif self.maxNbPROC==None:
                 returnVal=self.runSeq(runToDo, earlyExit, self.verbose)
             else:
-                returnVal=self.runPar(runToDo)
+                returnVal=self.runPar(runToDo, earlyExit)
 
             if(returnVal==self.PASS):
                 print("PASS(+" + str(len(runToDo))+"->"+str( len(cmpOnlyToDo) +len(cmpDone) +len(runToDo) )+")" )
+            if(returnVal==self.UNRESOLVED and (self.maxNbPROC==None or self.batchCompare)):
+                print("UNRESOLVED")
             return returnVal
         else:
             print("")
@@ -227,7 +1636,124 @@ class verrouTask:
 
 
 
+    def runStatTest(self):
+        """Run the samples by batches until the statistical test decides (at most nbRun samples)"""
+        if self.verbose:
+            self.printDir()
+        cmpOnlyToDo, runToDo, cmpDone=self.sampleToCompute(self.nbRun, earlyExit=False)
+        if len(cmpOnlyToDo)!=0:
+            self.cmpSeq(cmpOnlyToDo, earlyExit=False)
+        self.statInit()
+        source="cache"
+        decision=self.statDecision(len(runToDo))
+        while decision==None:
+            source="sprt"
+            nbProc=1 if self.maxNbPROC==None else self.maxNbPROC
+            batch=runToDo[:self.statBatchSize(nbProc)]
+            runToDo=runToDo[len(batch):]
+            self.statUpdate(self.runBatch(batch))
+            decision=self.statDecision(len(runToDo))
+        print(" --(%s) -> %s%s"%(source, decision, self.statStr()))
+        return decision
+
+    def runBatch(self, workToDo):
+        """Run and compare the samples of workToDo without early exit and return their results"""
+        if self.maxNbPROC==None:
+            results=[self.runSeq([work], False) for work in workToDo]
+        else:
+            scheduler=self.scheduler
+            if scheduler==None:
+                scheduler=sampleScheduler(self.maxNbPROC)
+            futures=[scheduler.submitSample(self, work) for work in workToDo]
+            waitFutures(futures)
+            if self.scheduler==None:
+                scheduler.shutdown()
+            results=futureResults(futures)
+        if self.batchCompare:
+            results=self.cmpDeferred(workToDo, results)
+        return results
+
+    def cmpChunkSize(self):
+        """Batch compare mode : number of finished runs compared by a single call of the compare script"""
+        return 1 if self.maxNbPROC==None else self.maxNbPROC
+
+    def runCmpBatch(self, workToDo):
+        """Batch compare mode : run the samples of workToDo and compare them by chunks (a single call of the compare
+        script per chunk) as the runs finish. The remaining samples are cancelled after a failing chunk."""
+        if self.maxNbPROC==None:
+            print(" --( run ) -> ",end="",flush=True)
+            results=[]
+            for work in workToDo:
+                res=self.runSeq([work], False)
+                if res==self.PASS:
+                    res=self.cmpBatch([work])[0]
+                results+=[res]
+                if res==self.FAIL:
+                    break
+        else:
+            print(" --(/run ) -> ",end="",flush=True)
+            results=self.runCmpChunks(workToDo)
+        if self.FAIL in results:
+            failIndices=[workToDo[indice] for indice in range(len(results)) if results[indice]==self.FAIL]
+            print("FAIL(%s)"%((str(failIndices)[1:-1])).replace(" ",""))
+            return self.FAIL
+        if self.UNRESOLVED in results:
+            return self.UNRESOLVED
+        return self.PASS
+
+    def runCmpChunks(self, workToDo):
+        """Parallel part of runCmpBatch : return the results of workToDo (None for the cancelled samples).
+
+        At most maxNbPROC jobs (runs and compare) are submitted at once, so that a compare is not queued behind
+        all the runs, and at most one compare is running (the chunks share the file dd.compare.batch.out)."""
+        scheduler=self.scheduler
+        if scheduler==None:
+            scheduler=sampleScheduler(self.maxNbPROC)
+        runFutures={}
+        remaining=list(workToDo)
+        results={}
+        toCmp=[]
+        cmpFuture=None
+        cmpSamples=[]
+        pending=set()
+        while True:
+            nbSubmitted=len([future for future in runFutures if not future.done()]) + (0 if cmpFuture==None else 1)
+            for work in remaining[:max(0, self.maxNbPROC-nbSubmitted)]:
+                future=scheduler.submitSample(self, work, cancelOnFail=True)
+                runFutures[future]=work
+                pending.add(future)
+            remaining=remaining[max(0, self.maxNbPROC-nbSubmitted):]
+            if len(pending)==0:
+                break
+            done, pending=waitFutures(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                if future.cancelled():
+                    continue
+                if future is cmpFuture:
+                    results.update(zip(cmpSamples, future.result()))
+                    cmpFuture=None
+                elif future.result()==self.PASS:
+                    toCmp+=[runFutures[future]]
+                else:
+                    results[runFutures[future]]=future.result()
+            if self.FAIL in results.values():
+                scheduler.cancel(self)
+                #the killed samples have to be finished before the next use of the directory
+                waitFutures(pending)
+                break
+            runsDone=len(remaining)==0 and all([future.done() for future in runFutures])
+            if cmpFuture==None and len(toCmp)!=0 and (len(toCmp)>=self.cmpChunkSize() or runsDone):
+                cmpSamples=toCmp
+                toCmp=[]
+                cmpFuture=scheduler.submitCmpBatch(self, cmpSamples)
+                pending.add(cmpFuture)
+        if self.scheduler==None:
+            scheduler.shutdown()
+        return [results.get(work) for work in workToDo]
+
     def cmpSeq(self,workToDo, earlyExit):
+        if self.batchCompare:
+            return self.FAIL if self.FAIL in self.cmpBatch(workToDo) else self.PASS
         res=self.PASS
         for run in workToDo:
             retVal=self.cmpOneSample(run,assertRun=False)
@@ -243,16 +1769,15 @@ class verrouTask:
             print(" --( run ) -> ",end="",flush=True)
         res=self.PASS
         for run in workToDo:
-            if not os.path.exists(self.nameDir(run)):
-                self.mkdir(run)
-            else:
-                print("Manual cache modification detected (runSeq)")
+            self.prepareDir(run)
 
             if self.alreadyFail:
                 if printStatus:
                     print(" "*len(self.pathToPrint)+" --( run ) -> ", end="", flush=True)
             self.runOneSample(run)
             retVal=self.cmpOneSample(run)
+            if retVal==self.UNRESOLVED and res==self.PASS:
+                res=self.UNRESOLVED
 
             if retVal=="FAIL":
                 res=self.FAIL
@@ -268,26 +1793,228 @@ class verrouTask:
         return res
 
 
-    def runPar(self,workToDo):
+    def runPar(self,workToDo, earlyExit=True):
         print(" --(/run ) -> ",end="",flush=True)
         import concurrent.futures
-        with concurrent.futures.ThreadPoolExecutor(max_workers=self.maxNbPROC) as executor:
-            futures=[executor.submit(self.runSeq, [work],False, False) for work in workToDo]
-            concurrent.futures.wait(futures)
-        if self.FAIL in [futur.result() for futur in futures]:
-            indices=[i for i in range(len(futures)) if futures[i].result()==self.FAIL]
+        scheduler=self.scheduler
+        if scheduler==None:
+            scheduler=sampleScheduler(self.maxNbPROC)
+        futures=[scheduler.submitSample(self, work, cancelOnFail=earlyExit) for work in workToDo]
+        waitFutures(futures)
+        if self.scheduler==None:
+            scheduler.shutdown()
+        results=futureResults(futures)
+        if self.FAIL in results:
+            indices=[i for i in range(len(futures)) if results[i]==self.FAIL]
             failIndices=[workToDo[indice] for indice in indices ]
             print("FAIL(%s)"%((str(failIndices)[1:-1])).replace(" ",""))
             return self.FAIL
+        if self.UNRESOLVED in results:
+            print("UNRESOLVED")
+            return self.UNRESOLVED
         return self.PASS
 
 
+def splitCost(size, fanOut, nbRun, failProbability, failDensity):
+    """Estimated number of runs to isolate the failing deltas of a failing configuration of size deltas,
+    recursively split in fanOut subsets.
+
+    At each level, the fraction failDensity of the subsets fails (detected after 1/failProbability runs
+    with early exit) and the other subsets pass (after nbRun runs)."""
+    if size<=1 or fanOut<=1:
+        return 0.
+    nbFail=min(float(fanOut), max(1., failDensity*fanOut))
+    depth=math.log(size)/math.log(fanOut)
+    return depth*((fanOut-nbFail)*nbRun + nbFail/failProbability)
+
+
+class runCostModel:
+    """Cost model of the samples : the wall time of a configuration is the wall time of the fastest configuration
+    measured plus the costs of its deltas. The extra time of a measured configuration is shared equally by its deltas
+    and the cost of a delta is the mean of its shares (the mean of all the shares if the delta was never measured)."""
+
+    def __init__(self):
+        self.baseTime=None
+        self.deltaShare={}
+        self.shareSum=0.
+        self.shareCount=0
+
+    def observe(self, deltas, wallTime):
+        if self.baseTime==None or wallTime<self.baseTime:
+            self.baseTime=wallTime
+        if len(deltas)==0:
+            return
+        share=(wallTime-self.baseTime)/len(deltas)
+        for delta in deltas:
+            stat=self.deltaShare.get(delta)
+            if stat==None:
+                self.deltaShare[delta]=[share, 1]
+            else:
+                stat[0]+=share
+                stat[1]+=1
+        self.shareSum+=share
+        self.shareCount+=1
+
+    def predict(self, deltas):
+        """Return the estimated wall time of a sample of the configuration deltas (None without measure)"""
+        if self.baseTime==None:
+            return None
+        defaultShare=0.
+        if self.shareCount!=0:
+            defaultShare=self.shareSum/self.shareCount
+        cost=self.baseTime
+        for delta in deltas:
+            stat=self.deltaShare.get(delta)
+            cost+=defaultShare if stat==None else stat[0]/stat[1]
+        return cost
+
+
+def groupTestDesign(deltas, nbDefective, seed=0):
+    """Return the pools of a non-adaptive group testing of deltas (random Bernoulli design).
+
+    Each delta belongs to each pool with probability 1/(nbDefective+1) and the number of pools
+    e*(nbDefective+1)*ln(len(deltas)) lets the COMP decoding clear all the non failing deltas but about one.
+    When this number exceeds the number of deltas, the pools are the singletons. The seed is fixed
+    to get the same pools (and so the cached results) from one session to the other."""
+    nbDelta=len(deltas)
+    nbPool=math.ceil(math.e*(nbDefective+1)*math.log(max(nbDelta,2)))
+    if nbPool>=nbDelta:
+        return [[delta] for delta in deltas]
+    rng=random.Random(seed)
+    prob=1./(nbDefective+1)
+    pools=[]
+    for i in range(nbPool):
+        pool=[delta for delta in deltas if rng.random()<prob]
+        if len(pool)!=0:
+            pools+=[pool]
+    return pools
+
+
+def groupTestDecode(deltas, pools, results):
+    """Decode the results of the pools : return the candidates (COMP) and the definite causes (DD).
+
+    COMP : the deltas of a passing pool are cleared, the others are candidates.
+    DD : a candidate alone among the candidates of a failing pool is a definite cause."""
+    cleared=set()
+    for pool, result in zip(pools, results):
+        if result==DD.DD.PASS:
+            cleared.update(pool)
+    candidates=listMinus(deltas, cleared)
+    candidateSet=set(candidates)
+    definite=set()
+    for pool, result in zip(pools, results):
+        if result==DD.DD.FAIL:
+            poolCandidates=[delta for delta in pool if delta in candidateSet]
+            if len(poolCandidates)==1:
+                definite.add(poolCandidates[0])
+    return candidates, [delta for delta in candidates if delta in definite]
+
+
+def groupTestUnexplained(candidates, pools, results, causes):
+    """Return the candidates still needed to explain the failing pools, knowing the confirmed causes.
+
+    A failing pool containing a cause is explained : a candidate whose failing pools are all explained
+    is dropped (if it is a cause too, it is found by the rddmin applied to the remaining deltas)."""
+    causeSet=set(causes)
+    needed=set()
+    explained=set()
+    for pool, result in zip(pools, results):
+        if result==DD.DD.FAIL:
+            target=explained if any(delta in causeSet for delta in pool) else needed
+            target.update(pool)
+        elif result!=DD.DD.PASS:
+            needed.update(pool)
+    return [delta for delta in candidates if delta in needed or not delta in explained]
+
+
+def readFilesAhead(fileNames, nbReader=8):
+    """Yield the list of the (right stripped) lines of each file of fileNames, in order.
+
+    The next nbReader files are read in parallel by threads, so at most nbReader files are in memory."""
+    def readLines(fileName):
+        with open(fileName, "r") as f:
+            return [line.rstrip() for line in f]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=nbReader) as executor:
+        window=[executor.submit(readLines, fileName) for fileName in fileNames[0:nbReader]]
+        for fileName in fileNames[nbReader:]+[None]*len(window):
+            future=window.pop(0)
+            if fileName!=None:
+                window.append(executor.submit(readLines, fileName))
+            yield future.result()
+
+
+def listMinus(deltas, toRemove):
+    """Return the deltas which are not in toRemove (the order of deltas is kept)"""
+    toRemoveSet=set(toRemove)
+    return [delta for delta in deltas if not delta in toRemoveSet]
+
+
 def md5Name(deltas):
     copyDeltas=copy.copy(deltas)
     copyDeltas.sort()
     return hashlib.md5(("".join(copyDeltas)).encode('utf-8')).hexdigest()
 
 
+class setHashNames:
+    """Map the set hash of a configuration to its directory name (md5Name).
+
+    The set hash is the sum modulo 2**128 of the md5 of each delta : it is order independent, so the deltas
+    do not need to be copied, sorted and joined. The md5 of the deltas of the search space are computed once
+    (see hashDeltas), so the set hash of a configuration is a single pass of dictionary lookups. md5Name is only
+    computed the first time a configuration is seen and the mapping is stored in fileName, so the directory
+    names are unchanged."""
+
+    modulo=2**128
+
+    def __init__(self, fileName):
+        self.fileName=fileName
+        self.deltaHash={}
+        self.names={}
+        if os.path.exists(fileName):
+            with open(fileName) as f:
+                for line in f:
+                    tab=line.rstrip("\n").split("\t")
+                    if len(tab)==2 and len(tab[1])==32:
+                        self.names[int(tab[0],16)]=tab[1]
+        self.handler=open(fileName,"a")
+
+    def hashDelta(self, delta):
+        h=self.deltaHash.get(delta)
+        if h==None:
+            h=int(hashlib.md5(delta.encode('utf-8')).hexdigest(),16)
+            self.deltaHash[delta]=h
+        return h
+
+    def hashDeltas(self, deltas):
+        """Compute once the md5 of deltas (the search space)"""
+        for delta in deltas:
+            self.hashDelta(delta)
+
+    def setHash(self, deltas):
+        try:
+            return sum(map(self.deltaHash.__getitem__, deltas)) % self.modulo
+        except KeyError:
+            #delta out of the search space
+            return sum([self.hashDelta(delta) for delta in deltas]) % self.modulo
+
+    def name(self, deltas):
+        """Return md5Name(deltas) (computed only if the set hash is unknown)"""
+        h=self.setHash(deltas)
+        name=self.names.get(h)
+        if name==None:
+            name=md5Name(deltas)
+            self.names[h]=name
+            self.handler.write("%032x\t%s\n"%(h,name))
+            self.handler.flush()
+        return name
+
+
+def md5DirNames(prefix):
+    """Return the list of configuration directories (named with md5Name) of prefix"""
+    return [item for item in os.listdir(prefix)
+            if len(item)==32 and all(i in ['a', 'b', 'c', 'd', 'e', 'f']+[str(x) for x in range(10)] for i in item)]
+
+
 def prepareOutput(dirname):
      shutil.rmtree(dirname, ignore_errors=True)
      os.makedirs(dirname)
@@ -300,6 +2027,87 @@ def failure():
 
 
 
+class ddCheckpoint:
+    """Checkpoint of the search (dd.checkpoint) : results of the completed searches (ddmin, split) and state of the
+    running ddmin searches, saved at each stable point.
+
+    The deltas are stored by their index in the search space and the searches are identified by their kind, their
+    number of samples and their deltas. The checkpoint is ignored if the fingerprint (search space, options, scripts)
+    changed."""
+
+    def __init__(self, fileName, fingerprint, delta0):
+        self.fileName=fileName
+        self.fingerprint=fingerprint
+        self.delta0=delta0
+        self.deltaIndex={delta:i for (i,delta) in enumerate(delta0)}
+        self.results={}
+        self.states={}
+        self.nbReused=0
+        if os.path.exists(fileName):
+            try:
+                with open(fileName) as f:
+                    data=json.load(f)
+            except ValueError:
+                data=None
+            if data!=None and data["fingerprint"]==fingerprint:
+                self.results=data["results"]
+                self.states=data["states"]
+            else:
+                print("checkpoint : %s ignored (search space or options changed)"%(fileName))
+
+    def save(self):
+        tmpName=self.fileName+".tmp"
+        with open(tmpName,"w") as f:
+            json.dump({"fingerprint":self.fingerprint, "results":self.results, "states":self.states}, f)
+        os.replace(tmpName, self.fileName)
+
+    def encode(self, obj):
+        """Replace the deltas (of nested lists) by their index (KeyError if a delta is not in the search space)"""
+        if isinstance(obj, str):
+            return self.deltaIndex[obj]
+        return [self.encode(item) for item in obj]
+
+    def decode(self, obj):
+        if isinstance(obj, int):
+            return self.delta0[obj]
+        return [self.decode(item) for item in obj]
+
+    def key(self, kind, deltas, nbRun):
+        """Return the key of the search (None if it can not be checkpointed)"""
+        try:
+            code=self.encode(deltas)
+        except KeyError:
+            return None
+        return "%s:%i:%s"%(kind, nbRun, hashlib.md5(json.dumps(code).encode("utf-8")).hexdigest())
+
+    def result(self, key):
+        """Return the result, the ddmin found and the statistics of the completed search key (None if unknown)"""
+        if key==None or not key in self.results:
+            return None
+        self.nbReused+=1
+        entry=self.results[key]
+        return (self.decode(entry["res"]), self.decode(entry["found"]), entry["stats"])
+
+    def setResult(self, key, result, found, stats):
+        if key==None:
+            return
+        self.results[key]={"res":self.encode(result), "found":self.encode(found), "stats":stats}
+        self.states.pop(key, None)
+        self.save()
+
+    def state(self, key):
+        if key==None or not key in self.states:
+            return None
+        state=self.states[key]
+        return [self.decode(state[0])]+state[1:]
+
+    def setState(self, key, state):
+        if key==None:
+            return
+        self.states[key]=[self.encode(state[0])]+list(state[1:])
+        self.save()
+
+
 class DDStoch(DD.DD):
     def __init__(self, config, prefix,
                  selectBlocAndNumLine=lambda x: (x,0), joinBlocAndNumLine= lambda x,y: x ):
@@ -313,14 +2121,54 @@ class DDStoch(DD.DD):
         self.compare_ = self.config_.get_cmpScript()
         self.cache_outcomes = False # the cache of DD.DD is ignored
         self.index=0
+        self.scheduler_=None
+        self.delta0_=None
+        self.limits_=runLimits(self.config_.get_runTimeout(), self.config_.get_runMemoryLimit(),
+                               self.config_.get_runCpuLimit(), self.config_.get_timeoutPolicy())
+        self.sharedCache_=None
+        if self.config_.get_sharedCache()!=None:
+            self.sharedCache_=sharedRunCache(self.config_.get_sharedCache())
+        self.cmpEnv_=None
+        self.cmpPlugin_=None
+        if cmpPlugin.isEntryPoint(self.compare_):
+            maxNbPROC=self.config_.get_maxNbPROC()
+            self.cmpPlugin_=cmpPlugin(self.compare_, 1 if maxNbPROC==None else maxNbPROC)
+            error=self.cmpPlugin_.check()
+            if error!=None:
+                print("Error : the comparison plugin %s can not be loaded (%s)"%(self.compare_, error))
+                failure()
+        self.statTest_=None
+        if self.config_.get_statTest()=="sprt":
+            self.statTest_=sprtTest(self.config_.get_sprtP0(), self.config_.get_sprtP1(), self.config_.get_statConfidence())
+            nbPassMin=self.statTest_.nbSampleToPass(0)
+            if nbPassMin>=self.config_.get_nbRUN():
+                print("Error : --stat-test=sprt needs %i successful samples to decide PASS : --nruns should be greater than %i (or change --sprt-p0, --sprt-p1, --stat-confidence)"%(nbPassMin, nbPassMin))
+                failure()
+            print("sprt : PASS after %i successful samples (as --nruns=%i without test), FAIL at the first failing sample"%(nbPassMin, nbPassMin))
+        self.statSaved_=0
+        self.costModel_=runCostModel()
+        self.costObserved_=set()
+        self.splitNbTested_=0 #subsets tested by the adaptive split
+        self.splitNbFail_=0
+        self.splitRun_=0 #runs of the adaptive split
+        self.splitAdaptiveCost_=0. #estimated costs (splitCost) of the adaptive and static fan-outs
+        self.splitStaticCost_=0.
         self.prefix_ = os.path.join(os.getcwd(),prefix)
         self.relPrefix_=prefix
         self.ref_ = os.path.join(self.prefix_, "ref")
         self.prepareCache()
-        prepareOutput(self.ref_)
-        self.reference() #generate the reference computation
+        self.prepareIndex()
+        if self.config_.get_eventLog():
+            self.index_.eventLog=eventLog(os.path.join(self.prefix_, "dd.events"))
+            self.index_.emit("start", prefix=self.relPrefix_, algo=self.config_.get_ddAlgo(), nbRun=self.config_.get_nbRUN(),
+                             nbProc=self.config_.get_maxNbPROC())
+        self.names_=setHashNames(os.path.join(self.prefix_, "dd.sethash"))
+        self.prepareReference() #generate the reference computation
         self.mergeList() #generate the search space
+        if self.getDelta0()!=None:
+            self.names_.hashDeltas(self.delta0_)
         self.rddminHeuristicLoadRep(selectBlocAndNumLine, joinBlocAndNumLine) # at the end because need the search space
+        self.prepareCheckpoint()
 
 
     def symlink(self,src, dst):
@@ -365,9 +2213,9 @@ class DDStoch(DD.DD):
 
         rddmin_heuristic_rep=[]
         if "cache" in self.config_.get_rddminHeuristicsCache():
-            if self.config_.get_cache()=="rename":
+            if self.config_.get_cache().startswith("rename"):
                 cacheRep=self.oldCacheName
-                if os.path.isdir(cacheRep):
+                if cacheRep!=None and os.path.isdir(cacheRep):
                     rddmin_heuristic_rep+=[cacheRep]
             else:
                 cacheRep=self.prefix_
@@ -382,6 +2230,7 @@ class DDStoch(DD.DD):
                 rddmin_heuristic_rep+=[rep]
 
         self.ddminHeuristic=[]
+        self.touchedDeltas_=set()
         if self.config_.get_cache=="continue":
             self.ddminHeuristic+=[ self.loadDeltaFile(rep)  for rep in self.saveCleanSymLink if "ddmin" in rep]
 
@@ -389,6 +2238,8 @@ class DDStoch(DD.DD):
             for rep in rddmin_heuristic_rep:
                 deltaOld=self.loadDeltaFile(os.path.join(rep,"ref"), True)
                 cvTool=convNumLineTool.convNumLineTool(deltaOld, self.getDelta0(), selectBlocAndNumLine, joinBlocAndNumLine)
+                if self.config_.get_incremental():
+                    self.incrementalImport(rep, cvTool, selectBlocAndNumLine)
                 repTab=glob.glob(os.path.join(rep, "ddmin*"))
 
                 for repDDmin in repTab:
@@ -408,6 +2259,44 @@ class DDStoch(DD.DD):
                         continue
                     self.ddminHeuristic+=[deltas]
 
+    def incrementalImport(self, rep, cvTool, selectBlocAndNumLine):
+        """Reuse the outcomes of the configurations of the previous cache rep whose deltas are all in blocs
+        not modified by the edit (see importOutcomes). The new deltas of the modified blocs are stored in touchedDeltas_."""
+        touchedBlocs=cvTool.touchedBlocs()
+        self.touchedDeltas_.update([delta for delta in self.getDelta0() if selectBlocAndNumLine(delta)[0] in touchedBlocs])
+        nbReused=0
+        for item in md5DirNames(rep):
+            includeFile=os.path.join(rep, item, self.getDeltaFileName()+".include")
+            if not os.path.exists(includeFile):
+                continue
+            deltas=[x.rstrip() for x in open(includeFile).readlines()]
+            if any(selectBlocAndNumLine(delta)[0] in touchedBlocs for delta in deltas):
+                continue
+            deltasNew=[]
+            for delta in deltas:
+                deltasNew+=cvTool.getNewLines(delta)
+            if self.importOutcomes(os.path.join(rep, item), deltasNew):
+                nbReused+=1
+        print("incremental : %i configurations reused from %s (%i modified blocs, %i new deltas)"%(nbReused, rep, len(touchedBlocs), len(self.touchedDeltas_)))
+
+    def importOutcomes(self, srcDir, deltas):
+        """Copy the compared samples of the configuration directory srcDir (of another cache) in the directory of
+        the configuration deltas (the file dd.imported contains srcDir) : return False if nothing is imported"""
+        dirname=os.path.join(self.prefix_, self.configName(deltas))
+        if self.index_.isKnown(os.path.basename(dirname)) or os.path.exists(dirname):
+            return False
+        runDirs=[runDir for runDir in os.listdir(srcDir)
+                 if runDir.startswith("dd.run") and os.path.exists(os.path.join(srcDir, runDir, "dd.return.value"))]
+        if len(runDirs)==0:
+            return False
+        os.makedirs(dirname)
+        for runDir in runDirs:
+            shutil.copytree(os.path.join(srcDir, runDir), os.path.join(dirname, runDir))
+        self.genExcludeIncludeFile(dirname, deltas, include=True, exclude=True)
+        with open(os.path.join(dirname, "dd.imported"), "w") as f:
+            f.write(os.path.abspath(srcDir)+"\n")
+        return True
+
     def loadDeltaFile(self,rep, ref=False):
         fileName=os.path.join(rep, self.getDeltaFileName()+".include")
         if ref:
@@ -436,12 +2325,16 @@ class DDStoch(DD.DD):
             symLinkTab=self.searchSymLink()
             repToKeep=[os.readlink(x) for x in symLinkTab]
             print(repToKeep)
-            for item in os.listdir(self.prefix_):
-                if len(item)==32 and all(i in ['a', 'b', 'c', 'd', 'e', 'f']+[str(x) for x in range(10)] for i in item) :
-                    if not item in repToKeep:
-                        shutil.rmtree(os.path.join(self.prefix_, item))
+            for item in md5DirNames(self.prefix_):
+                if not item in repToKeep:
+                    shutil.rmtree(os.path.join(self.prefix_, item))
+            #the index refers to removed directories
+            indexFile=os.path.join(self.prefix_, "dd.index")
+            if os.path.exists(indexFile):
+                os.remove(indexFile)
 
         if cache.startswith("rename"):
+            self.oldCacheName=None
             if os.path.exists(self.prefix_):
                 symLinkTab=self.searchSymLink()
                 if symLinkTab==[]:  #find alternative file to get time stamp
@@ -462,10 +2355,111 @@ class DDStoch(DD.DD):
             else:
                 self.cleanSymLink()
                 filesToDelete =glob.glob(os.path.join(self.prefix_, "*/dd.run[0-9]*/dd.compare.*"))
+                filesToDelete +=glob.glob(os.path.join(self.prefix_, "*/dd.compare.batch.*"))
                 filesToDelete +=glob.glob(os.path.join(self.prefix_, "*/dd.run[0-9]*/dd.return.value"))
+                filesToDelete +=glob.glob(os.path.join(self.prefix_, "dd.index"))
+                filesToDelete +=glob.glob(os.path.join(self.prefix_, "dd.checkpoint"))
                 for fileToDelete in filesToDelete:
                     os.remove(fileToDelete)
 
+    def prepareIndex(self):
+        """Open the outcome index (need to be called after prepareCache) : without --cache-index the index is only in memory"""
+        indexFile=os.path.join(self.prefix_, "dd.index")
+        if not self.config_.get_cacheIndex():
+            #the samples of this session are not recorded : an existing index would become stale
+            if os.path.exists(indexFile):
+                os.remove(indexFile)
+            self.index_=outcomeIndex(None)
+            return
+        newIndex=not os.path.exists(indexFile)
+        self.index_=outcomeIndex(indexFile)
+        if newIndex:
+            #the current directory layout is imported once
+            self.index_.importPrefix(self.prefix_)
+
+    def prepareReference(self):
+        """Generate the reference : with --checkpoint, the reference of the previous session is kept if its fingerprint is unchanged"""
+        fingerprint=None
+        if self.config_.get_checkpoint():
+            fingerprint=self.refFingerprint()
+            fingerprintFile=os.path.join(self.ref_, refFingerprintName)
+            if readRefDigest(self.ref_)!=None and os.path.exists(fingerprintFile) and open(fingerprintFile).readline().strip()==fingerprint:
+                print(os.path.relpath(self.ref_, os.getcwd())+" -- (checkpoint) -> PASS")
+                self.loadRefPayload()
+                return
+        prepareOutput(self.ref_)
+        self.reference()
+        if fingerprint!=None:
+            with open(fingerprintFile,"w") as f:
+                f.write(fingerprint+"\n")
+
+    def refFingerprint(self):
+        """Return the sha256 of what the reference depends on : scripts, verrou binaries and environment"""
+        env=self.referenceRunEnv()
+        env.update(verrouEnvironment())
+        items=[self.run_, fileFingerprint(self.run_), self.compare_, fileFingerprint(self.compare_),
+               self.config_.get_refExtract(), fileFingerprint(self.config_.get_refExtract()),
+               verrouFingerprint(), sorted(env.items())]
+        return hashlib.sha256(json.dumps(items).encode("utf-8")).hexdigest()
+
+    def loadRefPayload(self):
+        """Same as prepareRefPayload with the digest and the payload of the previous session"""
+        self.cmpEnv_={"VERROU_DD_REF_DIGEST": readRefDigest(self.ref_)}
+        if self.config_.get_refExtract()!=None:
+            self.cmpEnv_["VERROU_DD_REF_PAYLOAD"]=os.path.join(self.ref_, refPayloadName)
+
+    def prepareCheckpoint(self):
+        """Open the checkpoint of the search (need the search space) : only with --checkpoint"""
+        self.checkpoint_=None
+        self.foundRecorders_=[] #ddmin found by the running checkpointed searches
+        if not self.config_.get_checkpoint() or self.getDelta0()==None:
+            return
+        items=[self.refFingerprint(), self.getDelta0(), self.config_.get_ddAlgo(), self.config_.get_nbRUN(),
+               self.config_.get_rddMinTab(), self.config_.get_splitTab(), self.config_.get_dichoAdaptive(),
+               self.config_.get_ddminCostOrder(), self.config_.get_groupTestDefectives(), self.config_.get_statTest(),
+               self.config_.get_sprtP0(), self.config_.get_sprtP1(), self.config_.get_statConfidence()]
+        fingerprint=hashlib.sha256(json.dumps(items).encode("utf-8")).hexdigest()
+        self.checkpoint_=ddCheckpoint(os.path.join(self.prefix_, "dd.checkpoint"), fingerprint, self.getDelta0())
+
+    def splitStats(self):
+        return [self.splitNbTested_, self.splitNbFail_, self.splitRun_, self.splitAdaptiveCost_, self.splitStaticCost_]
+
+    def checkpointed(self, kind, deltas, nbRun, search):
+        """Return search() : with --checkpoint, the result is saved (with the ddmin found and the split statistics
+        of the search) and the search is not done again after a restart"""
+        if self.checkpoint_==None:
+            return search()
+        key=self.checkpoint_.key(kind, deltas, nbRun)
+        entry=self.checkpoint_.result(key)
+        if entry!=None:
+            (res, found, stats)=entry
+            for conf in found:
+                self.configuration_found("ddmin%d"%(self.index), conf)
+                self.index+=1
+            (self.splitNbTested_, self.splitNbFail_, self.splitRun_, self.splitAdaptiveCost_,
+             self.splitStaticCost_)=[x+y for (x,y) in zip(self.splitStats(), stats)]
+            return res
+        statsBefore=self.splitStats()
+        self.foundRecorders_.append([])
+        try:
+            res=search()
+        finally:
+            found=self.foundRecorders_.pop()
+        self.checkpoint_.setResult(key, res, found, [x-y for (x,y) in zip(self.splitStats(), statsBefore)])
+        return res
+
+    def ddminCheckpoint(self, c0, nbRun, c, n, cbar_offset, run):
+        if self.checkpoint_!=None:
+            self.checkpoint_.setState(self.checkpoint_.key("ddmin", c0, nbRun), (c, n, cbar_offset, run))
+
+    def ddminResume(self, c0, nbRun):
+        if self.checkpoint_==None:
+            return None
+        state=self.checkpoint_.state(self.checkpoint_.key("ddmin", c0, nbRun))
+        if state!=None:
+            print("ddmin : resumed from checkpoint (run #%i, %i deltas)"%(state[3], len(state[0])))
+        return state
+
     def reference(self):
         """Run the reference and check the result"""
         print(os.path.relpath(self.ref_, os.getcwd()),end="")
@@ -477,9 +2471,15 @@ class DDStoch(DD.DD):
             print("")
             self.referenceRunFailure()
         else:
+            self.prepareRefPayload()
             """Check the comparison between the reference and refrence is valid"""
-            retval = runCmd([self.compare_,self.ref_, self.ref_],
-                            os.path.join(self.ref_,"checkRef"))
+            if self.cmpPlugin_!=None:
+                retval=self.cmpPlugin_.compare(self.ref_, self.ref_, os.path.join(self.ref_,"checkRef"))
+            else:
+                retval = runCmd([self.compare_,self.ref_, self.ref_],
+                                os.path.join(self.ref_,"checkRef"), self.cmpEnv_)
+            if self.config_.get_batchCompare() and self.cmpPlugin_==None:
+                retval=batchCmpStatus(os.path.join(self.ref_,"checkRef.out"), 1, retval)[0]
             if retval != 0:
                 print("FAIL")
                 self.referenceFailsFailure()
@@ -487,8 +2487,29 @@ class DDStoch(DD.DD):
                 print("PASS")
 
 
+    def prepareRefPayload(self):
+        """Write the digest of the reference (dd.ref.digest) and the payload extracted once by --ref-extract
+        (dd.ref.payload) : both are given to the compare script with VERROU_DD_REF_DIGEST and VERROU_DD_REF_PAYLOAD"""
+        #the search space written by the reference run is not an output
+        digest=refDigest(self.ref_, lambda name: self.isFileValidToMerge(name) or name==self.getDeltaFileName())
+        with open(os.path.join(self.ref_, refDigestName),"w") as f:
+            f.write(digest+"\n")
+        self.cmpEnv_={"VERROU_DD_REF_DIGEST": digest}
+        extractScript=self.config_.get_refExtract()
+        if extractScript==None:
+            return
+        retval=runCmd([extractScript, self.ref_], os.path.join(self.ref_,"dd.ref.extract"))
+        if retval!=0:
+            print("")
+            print("FAILURE: the extraction of the reference payload fails")
+            print("Files to analyze:")
+            print("\t extract output: " +  os.path.join(self.ref_,"dd.ref.extract.out") + " " + os.path.join(self.ref_,"dd.ref.extract.err"))
+            failure()
+        os.rename(os.path.join(self.ref_,"dd.ref.extract.out"), os.path.join(self.ref_, refPayloadName))
+        self.cmpEnv_["VERROU_DD_REF_PAYLOAD"]=os.path.join(self.ref_, refPayloadName)
+
     def mergeList(self):
-        """merge the file name.$PID into a uniq file called name """
+        """merge the file name.$PID into a uniq file called name (the first occurrence order is kept)"""
         dirname=self.ref_
         name=self.getDeltaFileName()
 
@@ -496,27 +2517,28 @@ class DDStoch(DD.DD):
         if len(listOfExcludeFile)<1:
             self.searchSpaceGenerationFailure()
 
-#        with open(os.path.join(dirname,listOfExcludeFile[0]), "r") as f:
-#                excludeMerged=f.readlines()
-#        for excludeFile in listOfExcludeFile[1:]:
-        excludeMerged=[]
-        for excludeFile in listOfExcludeFile:
-            with open(os.path.join(dirname,excludeFile), "r") as f:
-                for line in f.readlines():
-                    rsline=line.rstrip()
-                    if rsline not in excludeMerged:
-                        excludeMerged+=[rsline]
+        nbReader=self.config_.get_maxNbPROC()
+        if nbReader==None:
+            nbReader=1
+        excludeMerged=set()
         with open(os.path.join(dirname, name), "w" )as f:
-            for line in excludeMerged:
-                f.write(line+"\n")
+            for lines in readFilesAhead([os.path.join(dirname,excludeFile) for excludeFile in listOfExcludeFile], nbReader):
+                for rsline in lines:
+                    if rsline not in excludeMerged:
+                        excludeMerged.add(rsline)
+                        f.write(rsline+"\n")
 
 
     def testWithLink(self, deltas, linkname, earlyExit=True):
         testResult=self._test(deltas, self.config_.get_nbRUN() , earlyExit)
-        dirname = os.path.join(self.prefix_, md5Name(deltas))
+        dirname = os.path.join(self.prefix_, self.configName(deltas))
         self.symlink(dirname, os.path.join(self.prefix_,linkname))
         return testResult
 
+    def configName(self, deltas):
+        """Return the name of the cache directory of the configuration deltas"""
+        return self.names_.name(deltas)
+
     def report_progress(self, c, title):
         if not self.config_.get_quiet:
             super().report_progress(c,title)
@@ -524,12 +2546,26 @@ class DDStoch(DD.DD):
     def configuration_found(self, kind_str, delta_config,verbose=True):
         if verbose:
             print("%s (%s):"%(kind_str,self.coerce(delta_config)))
+        self.index_.emit("found", kind=kind_str, config=self.configName(delta_config), size=len(delta_config))
+        if kind_str.startswith("ddmin"):
+            for recorder in self.foundRecorders_:
+                recorder.append(delta_config)
         earlyExit=True
         if self.config_.resWithAllSamples:
             earlyExit=False
         self.testWithLink(delta_config, kind_str, earlyExit)
 
     def run(self, deltas=None):
+        """Run the search : the scheduler is shut down even if the search is interrupted (the queued samples are then cancelled)"""
+        completed=False
+        try:
+            resConf=self.runSearch(deltas)
+            completed=True
+            return resConf
+        finally:
+            self.shutdownScheduler(cancel=not completed)
+
+    def runSearch(self, deltas):
 
         # get the search space
         if deltas==None:
@@ -539,6 +2575,7 @@ class DDStoch(DD.DD):
             emptySearchSpaceFailure()
 
         #basic verification
+        self.index_.setStage("verification")
         testResult=self._test(deltas)
         self.configuration_found("FullPerturbation",deltas)
         if testResult!=self.FAIL:
@@ -555,6 +2592,8 @@ class DDStoch(DD.DD):
         resConf=None
 
         def rddminAlgo(localDeltas):
+            if algo=="grouptest":
+                localConf = self.GroupTest(localDeltas, self.config_.get_nbRUN())
             if algo=="rddmin":
                 localConf = self.RDDMin(localDeltas, self.config_.get_nbRUN())
             if algo.startswith("srddmin"):
@@ -567,27 +2606,63 @@ class DDStoch(DD.DD):
             return localConf
 
         if self.useRddminHeuristic and "rddmin" in algo:
+            self.index_.setStage("heuristics")
             resConf=self.applyRddminWithHeuristics(deltas,rddminAlgo)
         else:
             resConf=rddminAlgo(deltas)
 
         if algo=="ddmax":
+            self.index_.setStage("ddmax")
             resConf= self.DDMax(deltas)
         else:
             if resConf!=None:
                 flatRes=[c  for conf in resConf for c in conf]
-                cmp= [delta for delta in deltas if  delta not in flatRes ]
+                cmp= listMinus(deltas, flatRes)
                 self.configuration_found("rddmin-cmp", cmp)
 
+        if self.statTest_!=None:
+            print("sprt : %i samples saved"%(self.statSaved_))
+        if self.config_.get_dichoAdaptive() and self.splitAdaptiveCost_!=0.:
+            #the measured runs are scaled by the ratio of the estimated costs of the static and adaptive fan-outs
+            staticRun=self.splitRun_*self.splitStaticCost_/self.splitAdaptiveCost_
+            print("adaptive split : %i runs (static granularity %i estimated : %i runs, %i saved)"%(self.splitRun_, self.config_.get_splitGranularity(), round(staticRun), round(staticRun-self.splitRun_)))
+        print("Runs by stage :\n"+self.index_.stageRunStr())
+        if self.sharedCache_!=None:
+            print("shared cache : %i samples reused"%(self.sharedCache_.nbHit))
+        if self.checkpoint_!=None and self.checkpoint_.nbReused!=0:
+            print("checkpoint : %i searches reused"%(self.checkpoint_.nbReused))
+        self.index_.emit("end", nbRun=self.index_.nbStageRun())
         return resConf
 
+    def getScheduler(self):
+        """Return the thread pool shared by all the configurations (created at first call)"""
+        if self.scheduler_==None:
+            if self.config_.get_queueDir()!=None:
+                self.scheduler_=queueScheduler(self.config_.get_queueDir())
+            elif self.config_.get_engine()=="asyncio":
+                maxNbPROC=self.config_.get_maxNbPROC()
+                self.scheduler_=asyncioScheduler(1 if maxNbPROC==None else maxNbPROC)
+            else:
+                self.scheduler_=sampleScheduler(self.config_.get_maxNbPROC())
+        return self.scheduler_
+
+    def shutdownScheduler(self, cancel=False):
+        if self.scheduler_!=None:
+            self.scheduler_.shutdown(cancel)
+            self.scheduler_=None
+        if self.cmpPlugin_!=None:
+            self.cmpPlugin_.shutdown()
+        if self.index_.eventLog!=None:
+            self.index_.eventLog.close()
+            self.index_.eventLog=None
+
     def applyRddminWithHeuristics(self,deltas, algo):
         """Test the previous ddmin configuration (previous run of DD_stoch) as a filter to rddmin algo"""
 
         res=[]
 
         for heuristicsDelta in self.ddminHeuristic:
-            if all(x in deltas for x in  heuristicsDelta): #check inclusion
+            if set(heuristicsDelta).issubset(deltas): #check inclusion
                 testResult=self._test(heuristicsDelta, self.config_.get_nbRUN())
                 if testResult!=self.FAIL:
                     if not self.config_.get_quiet():
@@ -599,14 +2674,21 @@ class DDStoch(DD.DD):
                         res+=[heuristicsDelta]
                         self.configuration_found("ddmin%d"%(self.index), heuristicsDelta)
                         self.index+=1
-                        deltas=[delta for delta in deltas if delta not in heuristicsDelta]
+                        deltas=listMinus(deltas, heuristicsDelta)
                     else:
                         resTab= self.check1Min(heuristicsDelta, self.config_.get_nbRUN())
                         for resMin in resTab:
                             res+=[resMin] #add to res
-                            deltas=[delta for delta in deltas if delta not in resMin] #reduce search space
+                            deltas=listMinus(deltas, resMin) #reduce search space
 
         print("Heuristics applied")
+        if self.config_.get_incremental():
+            #the deltas of the blocs modified by the edit are debugged first
+            touchedDeltas=[delta for delta in deltas if delta in self.touchedDeltas_]
+            if 0<len(touchedDeltas)<len(deltas) and self._test(touchedDeltas, self.config_.get_nbRUN())==self.FAIL:
+                resTouched=algo(touchedDeltas)
+                res+=resTouched
+                deltas=listMinus(deltas, [delta for conf in resTouched for delta in conf])
         #after the heuristic filter a classic (s)rddmin is applied
         testResult=self._test(deltas, self.config_.get_nbRUN())
         if testResult!=self.FAIL:
@@ -620,17 +2702,19 @@ class DDStoch(DD.DD):
 
     def DDMax(self, deltas):
         res=self.verrou_dd_max(deltas)
-        cmp=[delta for delta in deltas if delta not in res]
+        cmp=listMinus(deltas, res)
         self.configuration_found("ddmax", cmp)
         self.configuration_found("ddmax-cmp", res)
 
         return cmp
 
     def RDDMin(self, deltas,nbRun):
+        self.index_.setStage("rddmin nbRun=%i"%(nbRun))
+        self.index_.emit("phase", phase="RDDMin", size=len(deltas), nbRun=nbRun)
         ddminTab=[]
         testResult=self._test(deltas)
         if testResult!=self.FAIL:
-            self.internalError("RDDMIN", md5Name(deltas)+" should fail")
+            self.internalError("RDDMIN", self.configName(deltas)+" should fail")
 
         while testResult==self.FAIL:
             conf = self.verrou_dd_min(deltas,nbRun)
@@ -640,16 +2724,57 @@ class DDStoch(DD.DD):
             #print("ddmin%d (%s):"%(self.index,self.coerce(conf)))
 
             #update deltas
-            deltas=[delta for delta in deltas if delta not in conf]
+            deltas=listMinus(deltas, conf)
             testResult=self._test(deltas,nbRun)
             self.index+=1
         return ddminTab
 
+    def GroupTest(self, deltas, nbRun):
+        """Non-adaptive group testing : the random pools are tested in parallel, then the decoded
+        candidates are confirmed alone in two adaptive steps (the definite causes first, then the
+        candidates of the failing pools they do not explain). The remaining deltas (interactions
+        between deltas) are treated by rddmin."""
+        self.index_.setStage("grouptest pools")
+        self.index_.emit("phase", phase="GroupTest", size=len(deltas), nbRun=nbRun)
+        pools=groupTestDesign(deltas, self.config_.get_groupTestDefectives())
+        poolResults=self._testList(pools, nbRun)
+        candidates, definite=groupTestDecode(deltas, pools, poolResults)
+        print("grouptest : %i pools, %i candidates (%i definite)"%(len(pools), len(candidates), len(definite)))
+
+        self.index_.setStage("grouptest confirmation")
+        ddminTab=self.groupTestConfirm(definite, nbRun)
+        others=groupTestUnexplained(listMinus(candidates, definite), pools, poolResults, [conf[0] for conf in ddminTab])
+        print("grouptest : %i candidates to confirm after the definite ones"%(len(others)))
+        ddminTab+=self.groupTestConfirm(others, nbRun)
+
+        deltas=listMinus(deltas, [conf[0] for conf in ddminTab])
+        if len(deltas)!=0 and self._test(deltas, nbRun)==self.FAIL:
+            ddminTab+=self.RDDMin(deltas, nbRun)
+        return ddminTab
+
+    def groupTestConfirm(self, candidates, nbRun):
+        """Test the candidates alone (in parallel) : return the failing ones as ddmin configurations"""
+        ddminTab=[]
+        confirmResults=self._testList([[delta] for delta in candidates], nbRun)
+        for delta, testResult in zip(candidates, confirmResults):
+            if testResult==self.FAIL:
+                conf=[delta]
+                ddminTab += [conf]
+                self.configuration_found("ddmin%d"%(self.index), conf)
+                self.index+=1
+        return ddminTab
+
+    def _testList(self, deltasTab, nbRun):
+        """Test the configurations of deltasTab (in parallel if possible)"""
+        if self.config_.get_maxNbPROC() in [None,1]:
+            return [self._test(deltas, nbRun) for deltas in deltasTab]
+        return self._testTab(deltasTab, [nbRun]*len(deltasTab))
+
     def check1Min(self, deltas,nbRun):
         ddminTab=[]
         testResult=self._test(deltas)
         if testResult!=self.FAIL:
-            self.internalError("Check1-MIN", md5Name(deltas)+" should fail")
+            self.internalError("Check1-MIN", self.configName(deltas)+" should fail")
 
         for deltaMin1 in deltas:
             newDelta=[delta for delta in deltas if delta!=deltaMin1]
@@ -666,12 +2791,13 @@ class DDStoch(DD.DD):
     def splitDeltas(self, deltas,nbRun,granularity):
         nbProc=self.config_.get_maxNbPROC()
         if nbProc in [None,1]:
-            return self.splitDeltasSeq(deltas, nbRun, granularity)
-        return self.splitDeltasPar(deltas, nbRun, granularity,nbProc)
+            return self.checkpointed("split%i"%(granularity), deltas, nbRun, lambda: self.splitDeltasSeq(deltas, nbRun, granularity))
+        return self.checkpointed("split%i"%(granularity), deltas, nbRun, lambda: self.splitDeltasPar(deltas, nbRun, granularity,nbProc))
 
 
 
     def splitDeltasPar(self, deltas,nbRun,granularity, nbProc):
+        self.index_.emit("phase", phase="splitDeltasPar", size=len(deltas), nbRun=nbRun)
         if self._test(deltas, self.config_.get_nbRUN())==self.PASS:
             return [] #short exit
 
@@ -682,12 +2808,21 @@ class DDStoch(DD.DD):
         #name for progression
         algo_name="splitDeltasPara"
 
+        adaptive=self.config_.get_dichoAdaptive()
+        if adaptive:
+            nbRunStart=self.index_.nbStageRun()
+
         nbPara=math.ceil( nbProc/granularity)
         while len(toTreat)>0:
-            toTreatNow=toTreat[0:nbPara]
-            toTreatLater=toTreat[nbPara:]
-
-            ciTab=[self.split(candidat, min(granularity, len(candidat))) for candidat in toTreatNow]
+            if adaptive:
+                plan=self.adaptiveSplitPlan(toTreat, nbRun, nbProc, granularity)
+                toTreatNow=[candidat for (candidat, fanOut) in plan]
+                toTreatLater=toTreat[len(plan):]
+                ciTab=[self.split(candidat, fanOut) for (candidat, fanOut) in plan]
+            else:
+                toTreatNow=toTreat[0:nbPara]
+                toTreatLater=toTreat[nbPara:]
+                ciTab=[self.split(candidat, min(granularity, len(candidat))) for candidat in toTreatNow]
             flatciTab=sum(ciTab,[])
             flatResTab=self._testTab(flatciTab, [nbRun]* len(flatciTab))
             resTab=[]
@@ -714,10 +2849,50 @@ class DDStoch(DD.DD):
                             remainToTreat+=[conf]
                 if not splitFailed:
                     res+=[toTreatNow[i]]
+            if adaptive:
+                self.splitNbTested_+=len(flatResTab)
+                self.splitNbFail_+=flatResTab.count(self.FAIL)
 
             toTreat=remainToTreat+toTreatLater
+        if adaptive:
+            self.splitRun_+=self.index_.nbStageRun()-nbRunStart
         return res
 
+    def estimatedFailProbability(self, deltas):
+        """Return the estimated failure probability of the configuration deltas (rule of succession on its compared samples)"""
+        dirname=os.path.join(self.prefix_, self.configName(deltas))
+        status=verrouTask(dirname,None, None, None ,None, None, None, index=self.index_).cmpStatus()
+        nbFail=len([x for x in status.values() if x!=0])
+        return (nbFail+1.)/(len(status)+2.)
+
+    def splitFailDensity(self):
+        """Return the estimated fraction of failing subsets of a split (measured by the previous adaptive splits)"""
+        return (self.splitNbFail_+1.)/(self.splitNbTested_+2.)
+
+    def adaptiveSplitPlan(self, toTreat, nbRun, nbProc, granularity):
+        """Return the list of [candidat, fanOut] to split now (adaptive granularity).
+
+        The fan-out of each failing candidat minimizes the estimated number of runs (splitCost). As in the
+        static mode, about nbProc subsets are tested at once : the candidates are added while their subsets
+        fit in the nbProc slots."""
+        failDensity=self.splitFailDensity()
+        plan=[]
+        nbSlot=0
+        for candidat in toTreat:
+            size=len(candidat)
+            fanOut=1
+            if size>1:
+                failProbability=self.estimatedFailProbability(candidat)
+                fanOut=min(range(2, min(size, max(nbProc, 2))+1), key=lambda k: splitCost(size, k, nbRun, failProbability, failDensity))
+            if len(plan)!=0 and nbSlot+fanOut > nbProc:
+                break
+            if size>1:
+                self.splitAdaptiveCost_+=splitCost(size, fanOut, nbRun, failProbability, failDensity)
+                self.splitStaticCost_+=splitCost(size, min(granularity, size), nbRun, failProbability, failDensity)
+            plan+=[[candidat, fanOut]]
+            nbSlot+=fanOut
+        return plan
+
 
     def splitDeltasSeq(self, deltas,nbRun,granularity):
         if self._test(deltas, self.config_.get_nbRUN())==self.PASS:
@@ -809,6 +2984,7 @@ class DDStoch(DD.DD):
 
         currentSplit=[deltas]
         for run in runTab:
+            self.index_.setStage("split nbRun=%i"%(run))
             nextCurrent=[]
             for candidat in currentSplit:
                 if len(candidat)==1:
@@ -820,7 +2996,7 @@ class DDStoch(DD.DD):
 
             #the remainDeltas in recomputed from the wall list (indeed the set can increase with the apply )
             flatNextCurrent=[flatItem  for nextCurrentItem in nextCurrent for flatItem in nextCurrentItem]
-            remainDeltas=[delta for delta in deltas if delta not in flatNextCurrent ]
+            remainDeltas=listMinus(deltas, flatNextCurrent)
 
             #apply split to remainDeltas
             self.report_progress(remainDeltas,algo_name)
@@ -833,12 +3009,13 @@ class DDStoch(DD.DD):
     def DRDDMin(self, deltas, SrunTab, dicRunTab, granularity):#SrunTab=rddMinTab, dicRunTab=splitTab, granularity=2):
         #name for progression
         algo_name="DRDDMin"
+        self.index_.emit("phase", phase=algo_name, size=len(deltas), nbRun=SrunTab[-1])
 
         #assert with the right nbRun number
         nbRun=SrunTab[-1]
         testResult=self._test(deltas,nbRun)
         if testResult!=self.FAIL:
-            self.internalError("DRDDMIN", md5Name(deltas)+" should fail")
+            self.internalError("DRDDMIN", self.configName(deltas)+" should fail")
 
         #apply dichotomy
         candidats=self.SsplitDeltas(deltas,dicRunTab, granularity)
@@ -848,14 +3025,14 @@ class DDStoch(DD.DD):
         for candidat in candidats:
             if len(candidat)==1: #is a valid ddmin
                 res+=[candidat]
-                deltas=[delta for delta in deltas if delta not in candidat]
+                deltas=listMinus(deltas, candidat)
             else:
                 self.report_progress(candidat, algo_name)
                 #we do not known id candidat is a valid ddmin (in case of sparse pattern)
                 resTab=self.SRDDMin(candidat,SrunTab)
                 for resMin in resTab:
                     res+=[resMin] #add to res
-                    deltas=[delta for delta in deltas if delta not in resMin] #reduce search space
+                    deltas=listMinus(deltas, resMin) #reduce search space
         print("Dichotomy split analyze done")
 
         #after the split filter a classic (s)rddmin is applied
@@ -870,11 +3047,13 @@ class DDStoch(DD.DD):
     def SRDDMin(self, deltas,runTab):#runTab=rddMinTab):
         #name for progression
         algo_name="SRDDMin"
+        self.index_.emit("phase", phase=algo_name, size=len(deltas), nbRun=runTab[-1])
         #assert with the right nbRun number
         nbRun=runTab[-1]
+        self.index_.setStage("srddmin nbRun=%i"%(nbRun))
         testResult=self._test(deltas,nbRun)
         if testResult!=self.FAIL:
-            self.internalError("SRDDMIN", md5Name(deltas)+" should fail")
+            self.internalError("SRDDMIN", self.configName(deltas)+" should fail")
 
         ddminTab=[]
         nbMin=self._getSampleNumberToExpectFail(deltas)
@@ -884,6 +3063,7 @@ class DDStoch(DD.DD):
             filteredRunTab=[nbRun]
         #increasing number of run
         for run in filteredRunTab:
+            self.index_.setStage("srddmin nbRun=%i"%(run))
             testResult=self._test(deltas,run)
 
             #rddmin loop
@@ -902,7 +3082,7 @@ class DDStoch(DD.DD):
                 #print("ddmin%d (%s):"%(self.index,self.coerce(conf)))
                 self.index+=1
                 #update search space
-                deltas=[delta for delta in deltas if delta not in conf]
+                deltas=listMinus(deltas, conf)
                 #end test loop of rddmin
                 testResult=self._test(deltas,nbRun)
 
@@ -958,28 +3138,29 @@ class DDStoch(DD.DD):
 
 
     def getDelta0(self):
-        return self.loadDeltaFile(self.ref_, True)
+        """Return the search space (the reference delta file is read only once)"""
+        if self.delta0_==None:
+            self.delta0_=self.loadDeltaFile(self.ref_, True)
+            if self.delta0_==None:
+                return None
+        return list(self.delta0_)
 #        with open(os.path.join(self.ref_ ,self.getDeltaFileName()), "r") as f:
 #            return f.readlines()
 
 
     def genExcludeIncludeFile(self, dirname, deltas, include=False, exclude=False):
         """Generate the *.exclude and *.include file in dirname rep from deltas"""
-        excludes=self.getDelta0()
         dd=self.getDeltaFileName()
 
         if include:
             with open(os.path.join(dirname,dd+".include"), "w") as f:
-                for d in deltas:
-                    f.write(d+"\n")
+                f.write("".join([d+"\n" for d in deltas]))
 
         if exclude:
+            self.getDelta0() #load the search space
+            excludes=listMinus(self.delta0_, deltas)
             with open(os.path.join(dirname,dd+".exclude"), "w") as f:
-                for d in deltas:
-                    excludes.remove(d)
-
-                for line in excludes:
-                    f.write(line+"\n")
+                f.write("".join([line+"\n" for line in excludes]))
 
 
 
@@ -988,22 +3169,56 @@ class DDStoch(DD.DD):
             nbRun=self.config_.get_nbRUN()
 #        return self._testTab([deltas],[nbRun])[0]
 
-        dirname=os.path.join(self.prefix_, md5Name(deltas))
-        if not os.path.exists(dirname):
+        name=self.configName(deltas)
+        dirname=os.path.join(self.prefix_, name)
+        if not self.index_.isKnown(name) and not os.path.exists(dirname):
             os.makedirs(dirname)
             self.genExcludeIncludeFile(dirname, deltas, include=True, exclude=True)
 
-        vT=verrouTask(dirname, self.ref_, self.run_, self.compare_ ,nbRun, self.config_.get_maxNbPROC() , self.sampleRunEnv(dirname))
-        return vT.run(earlyExit=earlyExit)
+        #without --num-threads the samples are run sequentially by the task
+        scheduler=None if self.config_.get_maxNbPROC()==None else self.getScheduler()
+        vT=verrouTask(dirname, self.ref_, self.run_, self.compare_ ,nbRun, self.config_.get_maxNbPROC() , self.sampleRunEnv(dirname), index=self.index_, scheduler=scheduler, statTest=self.statTest_, sharedCache=self.sharedCache_, limits=self.limits_, batchCompare=self.config_.get_batchCompare(), cmpPlugin=self.cmpPlugin_, cmpEnv=self.cmpEnv_)
+        res=vT.run(earlyExit=earlyExit)
+        if self.statTest_!=None and earlyExit:
+            self.statSaved_+=vT.statSaved()
+        self.observeCost(deltas)
+        return res
+
+    def observeCost(self, deltas):
+        """Update the cost model with the wall times of the samples of the configuration deltas (once by configuration)"""
+        name=self.configName(deltas)
+        if name in self.costObserved_:
+            return
+        samples=self.index_.getSamples(name, os.path.join(self.prefix_, name))
+        wallTab=[status["wall"] for status in samples.values() if "wall" in status]
+        if len(wallTab)==0:
+            return
+        self.costObserved_.add(name)
+        self.costModel_.observe(deltas, sum(wallTab)/(1000.*len(wallTab)))
+
+    def costOrder(self, deltasTab, nbRunTab):
+        """Return the order of submission of the configurations : the longest first (LPT) with the cost model"""
+        costTab=[self.costModel_.predict(deltas) for deltas in deltasTab]
+        if None in costTab:
+            return list(range(len(deltasTab)))
+        return sorted(range(len(deltasTab)), key=lambda i: -costTab[i]*nbRunTab[i])
+
+    def complementOrder(self, c, cs, cbar_offset):
+        """With --ddmin-cost-order, the complements are tested from the cheapest (the one without the most expensive subset)"""
+        order=DD.DD.complementOrder(self, c, cs, cbar_offset)
+        if not self.config_.get_ddminCostOrder() or self.costModel_.predict([])==None:
+            return order
+        subsetCostTab=[self.costModel_.predict(subset) for subset in cs]
+        return sorted(order, key=lambda i: -subsetCostTab[i])
 
     def _getSampleNumberToExpectFail(self, deltas):
         nbRun=self.config_.get_nbRUN()
 
-        dirname=os.path.join(self.prefix_, md5Name(deltas))
+        dirname=os.path.join(self.prefix_, self.configName(deltas))
         if not os.path.exists(dirname):
             self.internalError("_getSampleNumberToExpectFail:", dirname+" should exist")
 
-        vT=verrouTask(dirname,None, None, None ,None, None, None)
+        vT=verrouTask(dirname,None, None, None ,None, None, None, index=self.index_)
         p=vT.getEstimatedFailProbability()
         if p==1.:
             return 1
@@ -1013,98 +3228,265 @@ class DDStoch(DD.DD):
 
 
 
-    def _testTab(self, deltasTab,nbRunTab=None):
+    def _testTab(self, deltasTab,nbRunTab=None, firstFail=False):
+        """Test in parallel the list of configurations deltasTab.
+
+        With firstFail, return as soon as the first failing configuration (with respect to the order of deltasTab)
+        is known : the queued samples of the following configurations are cancelled and their results are None."""
         nbDelta=len(deltasTab)
         if nbRunTab==None:
             nbRunTab=[self.config_.get_nbRUN()]*nbDelta
         import concurrent.futures
-        executor=concurrent.futures.ThreadPoolExecutor(max_workers=self.config_.get_maxNbPROC())
+        scheduler=self.getScheduler()
 
         resTab=[None] *nbDelta
         taskTab=[None] *nbDelta
-        indexCmp=[]
-        futureCmpTab=[None] *nbDelta
-        doCmpTab=[None] *nbDelta
-        indexRun=[]
-        futureRunTab=[None] *nbDelta
         workToDoTab=[None]*nbDelta
-        for i in range(nbDelta):
+        futureTab=[[] for i in range(nbDelta)]
+        phaseTab=[None]*nbDelta
+        futureToIndex={}
+        aliasTab=[None]*nbDelta #the same configuration can appear several times
+        firstByName={}
+        statTest=self.statTest_
+        remainingTab=[None]*nbDelta #samples not yet submitted (only with statTest)
+        batchCompare=self.config_.get_batchCompare()
+        sampleTab=[[] for i in range(nbDelta)] #samples of futureTab
+        cmpChunkTab=[[] for i in range(nbDelta)] #(future, samples) of the compared chunks (only with batchCompare)
+        runRemainingTab=[[] for i in range(nbDelta)] #runs not yet submitted (only with batchCompare)
+        nbProc=self.config_.get_maxNbPROC()
+        if nbProc==None:
+            nbProc=1
+
+        def submit(i, phase, workList):
+            """Submit the samples of workList : with batchCompare, the phases cmp and cmpBatch are a single job"""
+            phaseTab[i]=phase
+            if batchCompare and statTest==None and phase=="run":
+                #submitted by treatConfigBatch as the runs finish
+                runRemainingTab[i]=workList[nbProc:]
+                workList=workList[:nbProc]
+            sampleTab[i]=workList
+            if batchCompare and phase!="run":
+                futureTab[i]=[scheduler.submitCmpBatch(taskTab[i], workList)]
+            else:
+                futureTab[i]=[scheduler.submitSample(taskTab[i], work, phase=="run", cancelOnFail=(statTest==None)) for work in workList]
+            for future in futureTab[i]:
+                futureToIndex[future]=i
+            return futureTab[i]
+
+        def submitStat(i, source):
+            """Submit the next batch of samples of configuration i or print its decision"""
+            task=taskTab[i]
+            decision=task.statDecision(len(remainingTab[i]))
+            if decision==None:
+                batch=remainingTab[i][:task.statBatchSize(nbProc)]
+                remainingTab[i]=remainingTab[i][len(batch):]
+                return submit(i, "run", batch)
+            resTab[i]=decision
+            self.statSaved_+=task.statSaved()
+            task.printDir()
+            print(" --(/%s) -> %s%s"%(source, decision, task.statStr()))
+            return []
+
+        #without firstFail, the order of submission does not change the results
+        submitOrder=range(nbDelta) if firstFail else self.costOrder(deltasTab, nbRunTab)
+        for i in submitOrder:
             deltas=deltasTab[i]
-            dirname=os.path.join(self.prefix_, md5Name(deltas))
-            if not os.path.exists(dirname):
+            name=self.configName(deltas)
+            if (name, nbRunTab[i]) in firstByName:
+                aliasTab[i]=firstByName[(name,nbRunTab[i])]
+                continue
+            firstByName[(name,nbRunTab[i])]=i
+            dirname=os.path.join(self.prefix_, name)
+            if not self.index_.isKnown(name) and not os.path.exists(dirname):
                 os.makedirs(dirname)
                 self.genExcludeIncludeFile(dirname, deltas, include=True, exclude=True)
             #the node is there to avoid inner/outer parallelism
-            taskTab[i]=verrouTask(dirname, self.ref_, self.run_, self.compare_ ,nbRunTab[i], None , self.sampleRunEnv(dirname),verbose=False)
-            workToDo=taskTab[i].sampleToCompute(nbRunTab[i], earlyExit=True)
+            taskTab[i]=verrouTask(dirname, self.ref_, self.run_, self.compare_ ,nbRunTab[i], None , self.sampleRunEnv(dirname),verbose=False, index=self.index_, scheduler=scheduler, statTest=statTest, sharedCache=self.sharedCache_, limits=self.limits_, batchCompare=batchCompare, cmpPlugin=self.cmpPlugin_, cmpEnv=self.cmpEnv_)
+            workToDo=taskTab[i].sampleToCompute(nbRunTab[i], earlyExit=(statTest==None))
             workToDoTab[i]=workToDo
+            if statTest!=None:
+                remainingTab[i]=workToDo[1]
+                if len(workToDo[0])!=0:
+                    submit(i, "cmp", workToDo[0])
+                else:
+                    taskTab[i].statInit()
+                    submitStat(i, "cache")
+                continue
             if workToDo==None:
-                resTab[i]=(taskTab[i].FAIL,"cache")
+                resTab[i]=taskTab[i].FAIL
                 taskTab[i].printDir()
                 print(" --(/cache) -> FAIL")
-
                 continue
-#            print("WorkToDo", workToDo)
             cmpOnlyToDo=workToDo[0]
             runToDo=workToDo[1]
-            cmpDone=workToDo[2]
 
             if len(cmpOnlyToDo)==0 and len(runToDo)==0: #evrything in cache
-                resTab[i]=(taskTab[i].PASS,"cache")
+                resTab[i]=taskTab[i].PASS
                 taskTab[i].printDir()
                 print(" --(/cache) -> PASS("+ str(nbRunTab[i])+")")
                 continue
             if len(cmpOnlyToDo)!=0: #launch Cmp asynchronously
-                indexCmp+=[i]
-                futureCmpTab[i]=[executor.submit(taskTab[i].cmpSeq, [cmpConf],False) for cmpConf in cmpOnlyToDo]
-                continue
-            if len(runToDo)!=0: #launch run asynchronously
-                indexRun+=[i]
-                futureRunTab[i]=[ executor.submit(taskTab[i].runSeq, [run],False) for run in runToDo ]
-                continue
-            print("error parallel")
-            failure()
+                submit(i, "cmp", cmpOnlyToDo)
+            else: #launch run asynchronously
+                submit(i, "run", runToDo)
+
+        def getRes(i):
+            if aliasTab[i]!=None:
+                return resTab[aliasTab[i]]
+            return resTab[i]
+
+        def firstFailIndex():
+            for i in range(nbDelta):
+                res=getRes(i)
+                if res==None:
+                    return None
+                if res==self.FAIL:
+                    return i
+            return None
+
+        def sampleResults(i):
+            """Return the list of (sample, result) of the finished futures of configuration i"""
+            futures=futureTab[i]
+            if batchCompare and phaseTab[i]!="run":
+                if not futures[0].done():
+                    return []
+                return list(zip(sampleTab[i], futures[0].result()))
+            return [(sampleTab[i][j], futures[j].result()) for j in range(len(futures)) if futures[j].done() and not futures[j].cancelled()]
+
+        def treatConfigStat(i):
+            """Update the counters of the statistical test of configuration i when its batch is finished"""
+            if not all([future.done() for future in futureTab[i]]):
+                return []
+            results=sampleResults(i)
+            if phaseTab[i]=="cmp":
+                taskTab[i].statInit()
+            elif phaseTab[i]=="run" and batchCompare:
+                taskTab[i].statUpdate([res for (sample,res) in results if res!=self.PASS])
+                toCmp=[sample for (sample,res) in results if res==self.PASS]
+                if len(toCmp)!=0:
+                    return submit(i, "cmpBatch", toCmp)
+            else:
+                taskTab[i].statUpdate([res for (sample,res) in results])
+            return submitStat(i, "sprt")
 
-        for i in indexCmp: #wait cmp result
-            workToDo=workToDoTab[i]
-            cmpOnlyToDo, runToDo, cmpDone =workToDo[0],workToDo[1],workToDo[2]
+        def printPass(i):
+            cmpOnlyToDo, runToDo, cmpDone =workToDoTab[i]
+            resTab[i]=self.PASS
+            taskTab[i].printDir()
+            if phaseTab[i]=="cmp":
+                print(" --(/cmp/) -> PASS(+" + str(len(cmpOnlyToDo))+"->"+str(len(cmpDone) +len(cmpOnlyToDo))+")" )
+            else:
+                print(" --(/run/) -> PASS(+" + str(len(runToDo))+"->"+str( len(cmpOnlyToDo) +len(cmpDone) +len(runToDo) )+")" )
 
-            concurrent.futures.wait(futureCmpTab[i])
-            cmpResult=[future.result() for future in futureCmpTab[i]]
-            if taskTab[i].FAIL in cmpResult:
-                failIndex=cmpResult.index(taskTab[i].FAIL)
-                resTab[i]=(taskTab[i].FAIL, "cmp")
+        def treatConfigBatch(i):
+            """Batch compare mode : compare the finished runs of configuration i by chunks of nbProc samples
+            (at most one compare running, as the chunks share dd.compare.batch.out). At most nbProc jobs of
+            configuration i are submitted at once, so that a compare is not queued behind all the runs."""
+            runResults=sampleResults(i)
+            cmpResults=[(sample,res) for (future, samples) in cmpChunkTab[i] if future.done() and not future.cancelled()
+                        for (sample,res) in zip(samples, future.result())]
+            failSamples=[sample for (sample,res) in runResults+cmpResults if res==self.FAIL]
+            if len(failSamples)!=0:
+                resTab[i]=self.FAIL
+                scheduler.cancel(taskTab[i])
                 taskTab[i].printDir()
-                print(" --(/cmp/) -> FAIL(%i)"%(cmpOnlyToDo[failIndex]))
-
-            else: #launch run asynchronously (depending of cmp result)
-                runToDo=workToDoTab[i][1]
-                if len(runToDo)==0:
-                    resTab[i]=(taskTab[i].PASS,"cmp")
-                    taskTab[i].printDir()
-                    print(" --(/cmp/) -> PASS(+" + str(len(cmpOnlyToDo))+"->"+str(len(cmpDone) +len(cmpOnlyToDo))+")" )
-
-                    continue
+                print(" --(/run/) -> FAIL(%i)"%(failSamples[0]))
+                return []
+            compared=[sample for (future, samples) in cmpChunkTab[i] for sample in samples]
+            toCmp=[sample for (sample,res) in runResults if res==self.PASS and not sample in compared]
+            runsDone=len(runRemainingTab[i])==0 and all([future.done() for future in futureTab[i]])
+            cmpRunning=any([not future.done() for (future, samples) in cmpChunkTab[i]])
+            newFutures=[]
+            if not cmpRunning and len(toCmp)!=0 and (len(toCmp)>=nbProc or runsDone):
+                future=scheduler.submitCmpBatch(taskTab[i], toCmp)
+                cmpChunkTab[i]+=[(future, toCmp)]
+                futureToIndex[future]=i
+                newFutures+=[future]
+                cmpRunning=True
+            nbSubmitted=len([future for future in futureTab[i] if not future.done()]) + (1 if cmpRunning else 0)
+            for work in runRemainingTab[i][:max(0, nbProc-nbSubmitted)]:
+                future=scheduler.submitSample(taskTab[i], work, True, cancelOnFail=True)
+                futureTab[i]+=[future]
+                sampleTab[i]+=[work]
+                futureToIndex[future]=i
+                newFutures+=[future]
+            runRemainingTab[i]=runRemainingTab[i][max(0, nbProc-nbSubmitted):]
+            if len(newFutures)!=0 or not runsDone or cmpRunning or len(toCmp)!=0:
+                return newFutures
+            if self.UNRESOLVED in [res for (sample,res) in runResults+cmpResults]:
+                resTab[i]=self.UNRESOLVED
+                taskTab[i].printDir()
+                print(" --(/run/) -> UNRESOLVED")
+                return []
+            printPass(i)
+            return []
+
+        def treatConfig(i):
+            """Update the status of the configuration i with the finished futures"""
+            if statTest!=None:
+                return treatConfigStat(i)
+            if phaseTab[i]=="run" and batchCompare:
+                return treatConfigBatch(i)
+            cmpOnlyToDo, runToDo, cmpDone =workToDoTab[i]
+            futures=futureTab[i]
+            sampleResTab=sampleResults(i)
+            results=[res for (sample,res) in sampleResTab]
+            phase=phaseTab[i]
+            if self.FAIL in results:
+                failSample=[sample for (sample,res) in sampleResTab if res==self.FAIL][0]
+                resTab[i]=self.FAIL
+                taskTab[i].printDir()
+                if phase=="cmp":
+                    print(" --(/cmp/) -> FAIL(%i)"%(failSample))
                 else:
-                    futureRunTab[i]=[ executor.submit(taskTab[i].runSeq, [run], False) for run in runToDo]
-                    indexRun+=[i]
-                    continue
-
+                    print(" --(/run/) -> FAIL(%i)"%(failSample))
+                return []
+            if not all([future.done() for future in futures]):
+                return []
+            if phase=="cmp" and len(runToDo)!=0: #launch run asynchronously (depending of cmp result)
+                return submit(i, "run", runToDo)
+            if self.UNRESOLVED in results:
+                resTab[i]=self.UNRESOLVED
+                taskTab[i].printDir()
+                print(" --(/run/) -> UNRESOLVED")
+                return []
+            printPass(i)
+            return []
+
+        pending=set(futureToIndex.keys())
+        while len(pending)!=0:
+            if firstFail and firstFailIndex()!=None:
+                break
+            done, pending=waitFutures(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for i in sorted(set([futureToIndex[future] for future in done])):
+                if resTab[i]==None:
+                    pending|=set(treatConfig(i))
+
+        if len(pending)!=0: #only with firstFail
+            for i in range(nbDelta):
+                if taskTab[i]!=None and resTab[i]==None:
+                    scheduler.cancel(taskTab[i])
+                    taskTab[i].printDir()
+                    print(" --(/run/) -> cancelled")
+            #the killed samples have to be finished before the next use of the directories
+            waitFutures(pending)
 
-        for i in indexRun: #wait run result
-            workToDo=workToDoTab[i]
-            cmpOnlyToDo, runToDo, cmpDone =workToDo[0],workToDo[1],workToDo[2]
-            concurrent.futures.wait(futureRunTab[i])
-            runResult=[future.result() for future in futureRunTab[i]]
-            taskTab[i].printDir()
-            if taskTab[i].FAIL in runResult:
-                indexRun=runResult.index(taskTab[i].FAIL)
-                resTab[i]=(taskTab[i].FAIL, "index//")
-                print(" --(/run/) -> FAIL(%i)"%(runToDo[indexRun]))
-            else:
-                resTab[i]=(taskTab[i].PASS, "index//")
-                print(" --(/run/) -> PASS(+" + str(len(runToDo))+"->"+str( len(cmpOnlyToDo) +len(cmpDone) +len(runToDo) )+")" )
+        for i in range(nbDelta):
+            if taskTab[i]!=None:
+                self.observeCost(deltasTab[i])
+        return [getRes(i) for i in range(nbDelta)]
+
+    def _testFirstFail(self, deltasTab, nbRun):
+        """Return the index of the first failing configuration of deltasTab (None if all configurations pass)"""
+        if self.config_.get_maxNbPROC() in [None,1]:
+            return DD.DD._testFirstFail(self, deltasTab, nbRun)
+        resTab=self._testTab(deltasTab, [nbRun]*len(deltasTab), firstFail=True)
+        if self.FAIL in resTab:
+            return resTab.index(self.FAIL)
+        return None
 
-        #affichage à faire
-        return [res[0] for res in resTab]
+    def verrou_dd_min(self, c, nbRun):
+        if self.config_.get_ddminSpeculative() and not self.config_.get_maxNbPROC() in [None,1]:
+            return self.checkpointed("ddmin", c, nbRun, lambda: self.verrou_dd_min_speculative(c, nbRun, 2*self.config_.get_maxNbPROC()))
+        return self.checkpointed("ddmin", c, nbRun, lambda: DD.DD.verrou_dd_min(self, c, nbRun))
 
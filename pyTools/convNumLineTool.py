@@ -30,30 +30,40 @@ class convNumLineTool:
         for delta in deltas:
             (bloc, numLine)=selectBlocAndNumLineFunctor(delta)
             if bloc in res:
-                res[bloc]=res[bloc]+[numLine]
+                res[bloc].append(numLine)
             else:
                 res[bloc]=[numLine]
         return res
 
+    def touchedBlocs(self):
+        """Return the set of blocs modified between the two search spaces (a shifted bloc is not modified)"""
+        res=set()
+        for bloc in set(self.pOrg) | set(self.pNew):
+            diffTabOrg=self._convertLineTabToLineDiffTab(sorted(self.pOrg.get(bloc,[])))
+            diffTabNew=self._convertLineTabToLineDiffTab(sorted(self.pNew.get(bloc,[])))
+            if len(diffTabOrg)==0 or len(diffTabNew)==0 or diffTabOrg[1:]!=diffTabNew[1:]:
+                res.add(bloc)
+        return res
+
     def getNewLines(self, oldLine):
         """Function that convert the old line to the new one"""
         oldBloc, oldLineNum=self.selectBlocAndNumLineFunctor(oldLine)
-        if not oldBloc in self.cacheRes:
-            convTab=self._convBloc(oldBloc)
-            dic={}
-            for (key,value) in convTab:
-                if key in dic:
-                    dic[key]+=[value]
+        convDic=self.cacheRes.get(oldBloc)
+        if convDic==None:
+            convDic={}
+            for (key,value) in self._convBloc(oldBloc):
+                if key in convDic:
+                    convDic[key].append(value)
                 else:
-                    dic[key]=[value]
-            self.cacheRes[oldBloc]= dic
-        convDic=self.cacheRes[oldBloc]
+                    convDic[key]=[value]
+            self.cacheRes[oldBloc]= convDic
 
-        if oldLineNum not in convDic:
+        newLineNumTab=convDic.get(oldLineNum)
+        if newLineNumTab==None:
             raise AssertionError("Internal error oldLineNum should be in blocDic")
 
-        newLineNumTab=convDic[oldLineNum]
-        return [self.joinBlocAndNumLine(oldBloc, newLineNum) for newLineNum in newLineNumTab]
+        joinBlocAndNumLine=self.joinBlocAndNumLine
+        return [joinBlocAndNumLine(oldBloc, newLineNum) for newLineNum in newLineNumTab]
 
 
     def _convBloc(self,bloc):
@@ -80,32 +90,28 @@ class convNumLineTool:
 
             s = difflib.SequenceMatcher(None, diffTabOrg, diffTabNew)
             res=[]
+            append=res.append
             accOrg=0
             accNew=0
             for tag, i1, i2, j1, j2 in s.get_opcodes():
                 minSize=min(i2-i1, j2-j1)
                 for i in range(minSize):
-                    orgValue=accOrg+diffTabOrg[i1+i]
-                    newValue=accNew+diffTabNew[j1+i]
-                    accOrg=orgValue
-                    accNew=newValue
-                    res+=[(orgValue, newValue)]
+                    accOrg+=diffTabOrg[i1+i]
+                    accNew+=diffTabNew[j1+i]
+                    append((accOrg, accNew))
                 for i in range(i1+minSize,i2):
-                    orgValue=accOrg+diffTabOrg[i]
-                    accOrg=orgValue
-                    res+=[(orgValue, accNew)]
+                    accOrg+=diffTabOrg[i]
+                    append((accOrg, accNew))
                 for i in range(j1+minSize,j2):
-                    newValue=accNew+diffTabNew[j]
-                    orgValue=accOrg
-                    accNew=newValue
-                    res+=[(orgValue, newValue)]
+                    accNew+=diffTabNew[i]
+                    append((accOrg, accNew))
             return res
 
     def _convertLineTabToLineDiffTab(self,tab):
         #Conversion to successive numline difference format
         if len(tab)==0:
             return []
-        return [tab[0]]+ [tab[i] -tab[i-1] for i in range(1, len(tab))]
+        return [tab[0]]+ [current-previous for (previous, current) in zip(tab, tab[1:])]
 
 
 
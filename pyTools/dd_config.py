@@ -47,17 +47,38 @@ class ddConfig:
     def registerOptions(self):
         self.registryTab =[("nbRUN",                 "int",        "DD_NRUNS",                   ("--nruns="),                  5,          None, False)]
         self.registryTab+=[("maxNbPROC",             "int",        "DD_NUM_THREADS",             ("--num-threads="),            None,       None, False )]
-        self.registryTab+=[("ddAlgo",                "string",     "DD_ALGO",                    ("--algo="),                   "rddmin",   ["ddmax", "rddmin"], False)]
+        self.registryTab+=[("ddAlgo",                "string",     "DD_ALGO",                    ("--algo="),                   "rddmin",   ["ddmax", "rddmin", "grouptest"], False)]
         self.registryTab+=[("rddminVariant",         "string",     "DD_RDDMIN",                  ("--rddmin="),                 "d",        ["s", "stoch", "d", "dicho", "", "strict"],False)]
         self.registryTab+=[("param_rddmin_tab",      "string",     "DD_RDDMIN_TAB",              ("--rddmin-tab="),             "exp",      ["exp", "all", "single"], False)]
         self.registryTab+=[("param_dicho_tab",       "int/string", "DD_DICHO_TAB" ,              ("--dicho-tab="),              "half",     ["exp", "all", "half", "single"], False)]
+        self.registryTab+=[("groupTestDefectives",   "int",        "DD_GROUPTEST_DEFECTIVES",    ("--grouptest-defectives="),    2,         None, False)]
         self.registryTab+=[("splitGranularity",      "int",        "DD_DICHO_GRANULARITY",       ("--dicho-granularity="),       2,         None, False)]
+        self.registryTab+=[("dichoAdaptive",         "bool",       "DD_DICHO_ADAPTIVE",          ("--dicho-adaptive"),           False,     None, False)]
+        self.registryTab+=[("ddminSpeculative",      "bool",       "DD_DDMIN_SPECULATIVE",       ("--ddmin-speculative"),        False,     None, False)]
+        self.registryTab+=[("ddminCostOrder",        "bool",       "DD_DDMIN_COST_ORDER",        ("--ddmin-cost-order"),         False,     None, False)]
         self.registryTab+=[("ddQuiet",               "bool",       "DD_QUIET",                   ("--quiet"),                    False,     None, False)]
         self.registryTab+=[("cache",                 "string",     "DD_CACHE" ,                  ("--cache=") ,                  "continue",["clean", "rename", "rename_keep_result","keep_run", "continue"], False)]
         self.registryTab+=[("rddminHeuristicsCache", "string",     "DD_RDDMIN_HEURISTICS_CACHE", ("--rddmin-heuristics-cache="), "none",    ["none", "cache", "all_cache"], False)]
         self.registryTab+=[("rddminHeuristicsRep"  , "string",     "DD_RDDMIN_HEURISTICS_REP",   ("--rddmin-heuristics-rep="),   [] ,       "rep_exists", True)]
         self.registryTab+=[("rddminHeuristicsLineConv" , "bool",   "DD_RDDMIN_HEURISTICS_LINE_CONV",    ("--rddmin-heuristics-line-conv"),     False,     None, False)]
+        self.registryTab+=[("incremental",           "bool",       "DD_INCREMENTAL",             ("--incremental"),              False,     None, False)]
         self.registryTab+=[("resWithAllSamples"    , "bool",       "DD_RES_WITH_ALL_SAMPLES",    ("--res-with-all-samples"),     False,     None, False)]
+        self.registryTab+=[("cacheIndex",            "bool",       "DD_CACHE_INDEX",             ("--cache-index"),              False,     None, False)]
+        self.registryTab+=[("eventLog",              "bool",       "DD_EVENT_LOG",               ("--event-log"),                False,     None, False)]
+        self.registryTab+=[("checkpoint",            "bool",       "DD_CHECKPOINT",              ("--checkpoint"),               False,     None, False)]
+        self.registryTab+=[("runTimeout",            "float",      "DD_RUN_TIMEOUT",             ("--run-timeout="),             None,      None, False)]
+        self.registryTab+=[("runMemoryLimit",        "int",        "DD_RUN_MEMORY_LIMIT",        ("--run-memory-limit="),        None,      None, False)]
+        self.registryTab+=[("runCpuLimit",           "int",        "DD_RUN_CPU_LIMIT",           ("--run-cpu-limit="),           None,      None, False)]
+        self.registryTab+=[("timeoutPolicy",         "string",     "DD_TIMEOUT_POLICY",          ("--timeout-policy="),          "fail",    ["fail", "unresolved"], False)]
+        self.registryTab+=[("engine",                "string",     "DD_ENGINE",                  ("--engine="),                  "thread",  ["thread", "asyncio"], False)]
+        self.registryTab+=[("refExtract",            "string",     "DD_REF_EXTRACT",             ("--ref-extract="),             None,      None, False)]
+        self.registryTab+=[("batchCompare",          "bool",       "DD_BATCH_COMPARE",           ("--batch-compare"),            False,     None, False)]
+        self.registryTab+=[("queueDir",              "string",     "DD_QUEUE_DIR",               ("--queue-dir="),               None,      None, False)]
+        self.registryTab+=[("sharedCache",           "string",     "DD_SHARED_CACHE",            ("--shared-cache="),            None,      None, False)]
+        self.registryTab+=[("statTest",              "string",     "DD_STAT_TEST",               ("--stat-test="),               "none",    ["none", "sprt"], False)]
+        self.registryTab+=[("statConfidence",        "float",      "DD_STAT_CONFIDENCE",         ("--stat-confidence="),         0.95,      None, False)]
+        self.registryTab+=[("sprtP0",                "float",      "DD_SPRT_P0",                 ("--sprt-p0="),                 0.01,      None, False)]
+        self.registryTab+=[("sprtP1",                "float",      "DD_SPRT_P1",                 ("--sprt-p1="),                 0.2,       None, False)]
 
 
     def readDefaultValueFromRegister(self):
@@ -93,7 +114,7 @@ class ddConfig:
                     break
         if len(args)==2:
             self.runScript=self.checkScriptPath(args[0])
-            self.cmpScript=self.checkScriptPath(args[1])
+            self.cmpScript=self.checkCmpPath(args[1])
         else:
             self.usageCmd()
             self.failure()
@@ -113,6 +134,9 @@ class ddConfig:
     def usageCmd(self):
         print("Usage: "+ os.path.basename(sys.argv[0]) + " [options] runScript cmpScript")
         print(self.get_EnvDoc(self.config_keys[-1]))
+        print("Notes :")
+        print("\t--run-memory-limit : the OOM status is detected from the error messages at the end of dd.run.err (best-effort)")
+        print("\t--run-cpu-limit : RLIMIT_CPU applies to each process of the run script, use --run-timeout to bound the whole sample")
 
     def failure(self):
         sys.exit(42)
@@ -126,7 +150,43 @@ class ddConfig:
             self.usageCmd()
             self.failure()
 
+    def checkCmpPath(self,fpath):
+        """The compare script can be replaced by a python entry point module:function or file.py:function"""
+        if os.path.isfile(fpath) or not ":" in os.path.basename(fpath):
+            return self.checkScriptPath(fpath)
+        moduleName, functionName=fpath.rsplit(":",1)
+        if moduleName.endswith(".py"):
+            if not os.path.isfile(moduleName):
+                print("Invalid Cmd:"+str(sys.argv))
+                print(moduleName + " should be a python file")
+                self.usageCmd()
+                self.failure()
+            return os.path.abspath(moduleName)+":"+functionName
+        return fpath
+
     def normalizeOptions(self):
+        if not (0. <= self.sprtP0 < self.sprtP1 < 1.):
+            print("Error : the sprt probabilities should verify 0 <= p0 < p1 < 1")
+            self.failure()
+        if not (0.5 < self.statConfidence < 1.):
+            print("Error : the confidence level should be in ]0.5,1[")
+            self.failure()
+        if self.groupTestDefectives<1:
+            print("Error : the number of defectives of --grouptest-defectives should be at least 1")
+            self.failure()
+        if self.incremental:
+            if not self.cache.startswith("rename") and len(self.rddminHeuristicsRep)==0:
+                print("Error : --incremental requires a previous cache (--cache=rename or --rddmin-heuristics-rep=)")
+                self.failure()
+            #the previous results are converted to the new search space
+            self.rddminHeuristicsLineConv=True
+            if self.rddminHeuristicsCache=="none" and self.cache.startswith("rename"):
+                self.rddminHeuristicsCache="cache"
+        if self.refExtract!=None:
+            self.refExtract=self.checkScriptPath(self.refExtract)
+        if self.queueDir!=None and self.maxNbPROC==None:
+            print("Error : --queue-dir requires --num-threads (number of samples published at once)")
+            self.failure()
         if self.rddminVariant=="stoch":
             self.rddminVariant="s"
         if self.rddminVariant=="dicho":
@@ -140,6 +200,8 @@ class ddConfig:
 
         if conv_type=="int":
             value = int(strOption)
+        elif conv_type=="float":
+            value = float(strOption)
         else:
             value = strOption
 
@@ -202,6 +264,8 @@ class ddConfig:
             typeStr=""
             if attributType== "int":
                 typeStr="int"
+            if attributType== "float":
+                typeStr="float"
             if attributType== "int/string":
                 typeStr="or int"
             if attributType=="bool":
@@ -219,9 +283,21 @@ class ddConfig:
         return doc
 
     ## Accessors
+    def get_groupTestDefectives(self):
+        return self.groupTestDefectives
+
     def get_splitGranularity(self):
         return self.splitGranularity
 
+    def get_dichoAdaptive(self):
+        return self.dichoAdaptive
+
+    def get_ddminSpeculative(self):
+        return self.ddminSpeculative
+
+    def get_ddminCostOrder(self):
+        return self.ddminCostOrder
+
     def get_ddAlgo(self):
         if self.ddAlgo.endswith("rddmin"):
             return self.rddminVariant+self.ddAlgo
@@ -281,6 +357,54 @@ class ddConfig:
     def get_cache(self):
         return self.cache
 
+    def get_cacheIndex(self):
+        return self.cacheIndex
+
+    def get_eventLog(self):
+        return self.eventLog
+
+    def get_checkpoint(self):
+        return self.checkpoint
+
+    def get_runTimeout(self):
+        return self.runTimeout
+
+    def get_runMemoryLimit(self):
+        return self.runMemoryLimit
+
+    def get_runCpuLimit(self):
+        return self.runCpuLimit
+
+    def get_timeoutPolicy(self):
+        return self.timeoutPolicy
+
+    def get_engine(self):
+        return self.engine
+
+    def get_refExtract(self):
+        return self.refExtract
+
+    def get_batchCompare(self):
+        return self.batchCompare
+
+    def get_queueDir(self):
+        return self.queueDir
+
+    def get_sharedCache(self):
+        return self.sharedCache
+
+    def get_statTest(self):
+        return self.statTest
+
+    def get_statConfidence(self):
+        return self.statConfidence
+
+    def get_sprtP0(self):
+        return self.sprtP0
+
+    def get_sprtP1(self):
+        return self.sprtP1
+
 
     def get_rddminHeuristicsCache(self):
         return self.rddminHeuristicsCache
@@ -288,5 +412,8 @@ class ddConfig:
     def get_rddminHeuristicsRep_Tab(self):
         return self.rddminHeuristicsRep
 
+    def get_incremental(self):
+        return self.incremental
+
     def get_rddminHeuristicsLineConv(self):
         return self.rddminHeuristicsLineConv
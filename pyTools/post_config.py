@@ -28,6 +28,7 @@ class postConfig:
         self.registryTab+=[("trace_bin",    "bool",   "POST_TRACE_BIN",     ["--trace-bin"],     False, None, False)]
         self.registryTab+=[("trace_pattern","string", "POST_TRACE_PATTERN", ["--trace-pattern="], [],  None, True)]
         self.registryTab+=[("trace_file", "string",   "POST_TRACE_FILE",    ["--trace-file="],    None, None, False)]
+        self.registryTab+=[("shared_cache", "string", "POST_SHARED_CACHE",  ["--shared-cache="],  None, None, False)]
 
 
     def readDefaultValueFromRegister(self):
@@ -242,6 +243,9 @@ class postConfig:
     def get_trace_file(self):
         return self.trace_file
 
+    def get_shared_cache(self):
+        return self.shared_cache
+
     def get_trace(self):
         if self.trace_bin==True:
             return True
@@ -29,12 +29,21 @@ def loadResult(rep):
 
 if __name__=="__main__":
 
-    resRep=sys.argv[1]
-    resOut=sys.argv[2]
+    #--restrict-to-sym-ddmin=DDSYMREP : check a line search restricted to the symbols of the ddmin of DDSYMREP (verrou_dd_hier)
+    symRep=None
+    args=sys.argv[1:]
+    if args[0].startswith("--restrict-to-sym-ddmin="):
+        symRep=args[0].replace("--restrict-to-sym-ddmin=","")
+        args=args[1:]
+    resRep=args[0]
+    resOut=args[1]
 
     ddCase=ddRun.ddConfig()
     ref=os.path.join(resRep,"ref")
     ddCase.unpickle(os.path.join(ref,"dd.pickle"))
+    if symRep!=None:
+        symList=[int(line.split()[0].replace("sym-","")) for ddmin in loadResult(symRep)["ddmin"] for line in ddmin]
+        ddCase.restrictToSym(symList)
 
     loadedRes=loadResult(resRep)
 
@@ -20,7 +20,7 @@ if __name__=="__main__":
     else:
         ddCase=ddRun.ddConfig()
         ref=sys.argv[1]
-        ddCase.unpickle(os.path.join(ref,"dd.pickle"))
+        ddCase.unpickle(os.environ.get("VERROU_DD_REF_PAYLOAD", os.path.join(ref,"dd.pickle")))
         toCmp=sys.argv[2]
         sys.exit(cmpNorm(ref, toCmp, ddCase))
     
@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+#batch compare mode (--batch-compare) : one return value per run directory on stdout
+
+import sys
+import os
+import contextlib
+import ddRun
+from ddCmp import cmpNorm
+
+
+if __name__=="__main__":
+    ref=sys.argv[1]
+    ddCase=None
+    for toCmp in sys.argv[2:]:
+        if toCmp==ref:
+            print(0)
+            continue
+        if ddCase==None:
+            ddCase=ddRun.ddConfig()
+            ddCase.unpickle(os.path.join(ref,"dd.pickle"))
+        with contextlib.redirect_stdout(sys.stderr):
+            status=cmpNorm(ref, toCmp, ddCase)
+        print(status)
@@ -0,0 +1,18 @@
+#comparison plugin (./ddCmpPlugin.py:cmpPlugin) : the reference is loaded once per process
+
+import os
+import ddRun
+from ddCmp import cmpNorm
+
+
+def loadReference(ref):
+    ddCase=ddRun.ddConfig()
+    ddCase.unpickle(os.path.join(ref,"dd.pickle"))
+    return (ref, ddCase)
+
+
+def cmpPlugin(reference, toCmp):
+    ref, ddCase=reference
+    if ref==toCmp:
+        return 0
+    return cmpNorm(ref, toCmp, ddCase)
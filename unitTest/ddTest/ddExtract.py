@@ -0,0 +1,9 @@
+#!/usr/bin/env python3
+#reference payload (--ref-extract) : the serialized configuration is extracted once from the reference
+
+import sys
+import os
+
+if __name__=="__main__":
+    with open(os.path.join(sys.argv[1],"dd.pickle"),"rb") as f:
+        sys.stdout.buffer.write(f.read())
@@ -50,6 +50,12 @@ class ddConfig:
         self.listOf2Failures=pickle.load(fileHandler)
         self.nbSym=len(self.listOf1Failure)
 
+    def restrictToSym(self, symList):
+        """Restrict the lines to the symbols of symList (the search space of the line level of verrou_dd_hier)"""
+        self.listOf1Failure=[(sym, failure, listOfLine if sym in symList else [])
+                             for (sym, failure, listOfLine) in self.listOf1Failure]
+        self.listOf2Failures=[x for x in self.listOf2Failures if x[0][0] in symList and x[0][1] in symList]
+
     def listOfIntSym(self):
         """Return the int list of symbol"""
         return range(self.nbSym)
@@ -337,6 +343,8 @@ def runRef(dir_path, ddCase):
     print("ref")
     if "dd.sym" in dir_path and not "dd.line" in dir_path:
         generateFakeExclusion(ddCase)
+        if "VERROU_GEN_SOURCE" in os.environ:
+            generateFakeSource(ddCase)
         ddCase.pickle(os.path.join(dir_path,"dd.pickle"))
         return 0
     if "dd.line" in dir_path:
@@ -347,6 +355,10 @@ def runRef(dir_path, ddCase):
 
 def runNorm(dir_path, ddCase):
     print("norm")
+    #to check the environment of the samples run by verrou_dd_worker
+    f=open(os.path.join(dir_path, "rounding_mode"), "w")
+    f.write(os.environ.get("VERROU_ROUNDING_MODE", "")+"\n")
+    f.close()
     if "dd.sym" in dir_path and not "dd.line" in dir_path:
         f=open(os.path.join(dir_path , "path_exclude"), "w")
         f.write(os.environ["VERROU_EXCLUDE"]+"\n")
@@ -358,8 +370,20 @@ def runNorm(dir_path, ddCase):
         f.close()
 
 
+def listOfLineFailure(sym):
+    """Return the lines of sym with their failure : with DD_TEST_EDIT, simulate a source edit which shifts
+    the lines of sym-17 (without change of behaviour) and adds a line to sym-18"""
+    res=[(line, max(0, line-8)) for line in range(11) ]
+    if "DD_TEST_EDIT" in os.environ:
+        if sym==17:
+            res=[(line+5, failure) for (line, failure) in res]
+        if sym==18:
+            res+=[(11, 0)]
+    return res
+
+
 if __name__=="__main__":
-    ddCase=ddConfig([(sym, max(0, sym-16), [(line, max(0, line-8)) for line in range(11) ] ) for sym in range(20)],
+    ddCase=ddConfig([(sym, max(0, sym-16), listOfLineFailure(sym)) for sym in range(20)],
                     [((0,1), 1, [(0,line, 1,max(0,line-1)) for line in range(4)])  ]
     )
 #    ddCase=ddConfig([(0, 0, []),
@@ -0,0 +1,14 @@
+#!/usr/bin/env python3
+
+# Same run script as ddRun.py, but the first sample of the full perturbation sleeps in a child
+# process (to exceed --run-timeout and check the kill of the process group)
+
+import sys
+import os
+import subprocess
+
+if __name__=="__main__":
+    if os.path.basename(sys.argv[1])=="dd.run0" and os.path.getsize(os.environ["VERROU_EXCLUDE"])==0:
+        subprocess.call(["sleep", "37"])
+    ddRun=os.path.join(os.path.dirname(os.path.abspath(__file__)), "ddRun.py")
+    os.execv(ddRun, [ddRun]+sys.argv[1:])
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+
+# Check of the thresholds of the sequential test of --stat-test=sprt
+
+import math
+from valgrind import DD_stoch
+from valgrind import DD
+
+def checkThresholds(p0, p1, confidence, nbPassExpected):
+    test=DD_stoch.sprtTest(p0, p1, confidence)
+    risk=1.-confidence
+    assert abs(test.lower-math.log(risk/(1.-risk)))<1e-12
+    assert abs(test.logLikelihoodRatio(nbPassExpected)-nbPassExpected*math.log((1.-p1)/(1.-p0)))<1e-12
+
+    #PASS is decided after exactly nbPassExpected successful samples
+    assert test.nbSampleToPass(0)==nbPassExpected
+    assert test.decide(nbPassExpected-1, 0)==None
+    assert test.decide(nbPassExpected, 0)==DD.DD.PASS
+    assert test.nbSampleToPass(nbPassExpected-1)==1
+
+    #any failing sample is a FAIL, whatever the number of successful samples
+    assert test.decide(0, 1)==DD.DD.FAIL
+    assert test.decide(1, 1)==DD.DD.FAIL
+    assert test.decide(10*nbPassExpected, 1)==DD.DD.FAIL
+
+
+if __name__=="__main__":
+    checkThresholds(0.01, 0.2, 0.95, 14)
+    checkThresholds(0.,   0.2, 0.95, 14)
+    checkThresholds(0.01, 0.5, 0.99, 7)
+    print("sprt thresholds : ok")